@@ -0,0 +1,168 @@
+from array import array
+from copy import copy
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, \
+    Union
+from weakref import ref
+
+import panek.typing as t
+from panek.error import MissingColumnError
+
+__all__ = [
+    'Archetype',
+]
+
+Column = Union[List, array]
+
+
+class Archetype:
+    """
+    Dense columnar storage of chosen attributes for objects of one type.
+
+    Row `i` of every column belongs to `entities[i]`. Removing an object
+    moves the last row into the freed slot, so columns never have holes.
+
+    Columns are plain lists unless a typecode is given for the attribute,
+    then `array.array` is used which exposes the buffer protocol and may be
+    wrapped without copying (e.g. by `numpy.frombuffer`).
+
+    Forked archetypes share rows until either of them is modified. Rows
+    belong to the archetype which was forked, the fork gets a copy, so
+    columns taken before the fork keep reflecting their archetype. Columns
+    taken out may be written to at any time, so once they were, the fork
+    copies rows right away.
+    """
+
+    def __init__(
+        self,
+        type_: t.ObjectType,
+        attributes: Sequence[str],
+        typecodes: Optional[Dict[str, str]] = None
+    ):
+        typecodes = typecodes or dict()
+        self.type = type_
+        self.attributes = tuple(attributes)
+        self.entities: List[t.Object] = list()
+        self._rows: Dict[t.Object, int] = dict()
+        self._columns: Dict[str, Column] = {
+            name: array(typecodes[name]) if name in typecodes else list()
+            for name in self.attributes
+        }
+        self._source: Optional[ref] = None
+        self._forks: List[ref] = list()
+        self._exposed = False
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, obj: t.Object) -> bool:
+        return obj in self._rows
+
+    def __iter__(self) -> Iterator[t.Object]:
+        return iter(self.entities)
+
+    def fork(self) -> 'Archetype':
+        forked = copy(self)
+        forked._forks = list()
+        forked._exposed = False
+        if self._exposed:
+            forked._source = ref(self)
+            forked._unshare()
+        elif self._source is None:
+            forked._source = ref(self)
+            self._forks.append(ref(forked))
+        else:
+            owner = self._source()
+            if owner is not None:
+                owner._forks.append(ref(forked))
+        return forked
+
+    def column(self, name: str) -> Column:
+        self._unshare()
+        try:
+            column = self._columns[name]
+        except KeyError:
+            raise MissingColumnError(
+                f'`{self.type.__name__}` archetype has no column `{name}`'
+            )
+        self._exposed = True
+        return column
+
+    def row(self, obj: t.Object) -> int:
+        return self._rows[obj]
+
+    def load(self, *objects: t.Object):
+        """
+        Read attributes of the objects (all by default) into the columns.
+        """
+        self._unshare()
+        rows = self._rows
+        for obj in objects or self.entities:
+            row = rows[obj]
+            for name, column in self._columns.items():
+                column[row] = getattr(obj, name)
+
+    def store(self, *objects: t.Object):
+        """
+        Write column values back to attributes of the objects (all by default).
+        """
+        rows = self._rows
+        for obj in objects or self.entities:
+            row = rows[obj]
+            for name, column in self._columns.items():
+                setattr(obj, name, column[row])
+
+    def _unshare(self):
+        """
+        Make rows safe to modify: a fork copies shared rows, the owner hands
+        copies to forks still sharing its rows.
+        """
+        if self._source is not None:
+            self._source = None
+            self.entities = list(self.entities)
+            self._rows = dict(self._rows)
+            self._columns = {
+                name: copy(column) for name, column in self._columns.items()
+            }
+
+        forks, self._forks = self._forks, list()
+        for forked in forks:
+            forked = forked()
+            if forked is not None and forked._source is not None:
+                forked._unshare()
+
+    def _read(self, obj: t.Object) -> Tuple[Any, ...]:
+        """
+        Row of the object, raises if any value does not fit its column.
+        """
+        values = tuple(getattr(obj, name) for name in self.attributes)
+        for value, column in zip(values, self._columns.values()):
+            if isinstance(column, array):
+                array(column.typecode, (value,))
+        return values
+
+    def _append(self, obj: t.Object):
+        if obj in self._rows:
+            return
+        values = self._read(obj)
+        self._unshare()
+        for value, column in zip(values, self._columns.values()):
+            column.append(value)
+        self._rows[obj] = len(self.entities)
+        self.entities.append(obj)
+
+    def _swap_remove(self, obj: t.Object):
+        if obj not in self._rows:
+            return
+        self._unshare()
+        row = self._rows.pop(obj)
+
+        entities = self.entities
+        last = len(entities) - 1
+        for column in self._columns.values():
+            column[row] = column[last]
+            column.pop()
+
+        moved = entities.pop()
+        if row != last:
+            entities[row] = moved
+            self._rows[moved] = row
@@ -0,0 +1,236 @@
+from abc import ABC, abstractmethod
+from itertools import count
+from operator import methodcaller
+from typing import Callable, Collection, Hashable, Iterator, Optional, Set
+
+import panek.typing as t
+from panek.cow import CopyOnWriteDict
+from panek.error import ForkNotSupportedError
+from panek.ordered import Cursor, Page
+
+__all__ = [
+    'StorageBackend',
+    'MemoryBackend',
+    'BackendFactory',
+]
+
+Members = Collection[t.Object]
+
+_epochs = count(1)
+
+
+class StorageBackend(ABC):
+    """
+    Keeps collections of members by key.
+
+    ObjectRelationMapper uses one backend for relations (keyed by relation
+    id) and one for types (keyed by type). Collections returned by `get`
+    must not be modified by the caller.
+
+    KEY_ORDER - OrderedManyRelation with `key` can be kept.
+    epoch - changes whenever a collection found current by `is_current` may
+    stop reflecting its key. Unique among backends, so callers may cache such
+    collections with the epoch and reuse them without any lookup.
+    """
+
+    KEY_ORDER = True
+    epoch = 0
+    _current: Set[Hashable] = frozenset()
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Members]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(
+        self,
+        key: Hashable,
+        member: t.Object,
+        factory: Callable[[], Members] = set
+    ) -> bool:
+        """
+        Add member, create collection with `factory` if key is missing.
+        Returns False if member was already there.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, key: Hashable, member: t.Object):
+        """
+        Raises KeyError if key or member is missing.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace(self, key: Hashable, members: Optional[Members]):
+        """
+        Replace all members of the key, empty members remove the key.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: Hashable):
+        """
+        Raises KeyError if key is missing.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def __contains__(self, key: Hashable) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def keys(self) -> Iterator[Hashable]:
+        raise NotImplementedError
+
+    def iter_members(self, key: Hashable) -> Iterator[t.Object]:
+        return iter(self.get(key) or ())
+
+    def has_member(self, key: Hashable, member: t.Object) -> bool:
+        members = self.get(key)
+        return members is not None and member in members
+
+    def is_current(self, key: Hashable, members: Optional[Members]) -> bool:
+        """
+        Whether collection returned by `get` reflects the key until `epoch`
+        changes, so it may be cached by the caller. False if it is not known.
+        """
+        return False
+
+    def page(
+        self,
+        key: Hashable,
+        after: Optional[Cursor] = None,
+        limit: Optional[int] = None
+    ) -> Page:
+        """
+        Page of OrderedMembers kept under the key.
+        """
+        members = self.get(key)
+        if not members:
+            return Page(items=list(), cursor=None)
+        return members.page(after, limit)
+
+    @property
+    def tombstones(self) -> int:
+        """
+        Number of deleted keys still remembered for forks.
+        """
+        return 0
+
+    def compact(self) -> int:
+        """
+        Forget deleted keys remembered for forks, returns their number.
+        """
+        return 0
+
+    def fork(self) -> 'StorageBackend':
+        raise ForkNotSupportedError(
+            f'`{type(self).__name__}` does not support fork'
+        )
+
+    def release(self, obj: t.Object):
+        """
+        Object was reclaimed by the mapper and is not kept by any key.
+        """
+
+    def flush(self):
+        pass
+
+    def _keep_current(self, key: Hashable) -> bool:
+        self._current.add(key)
+        return True
+
+    def _invalidate(self, key: Optional[Hashable] = None):
+        """
+        Change epoch if collection of the key, or of any key by default, was
+        found current since the last change.
+        """
+        if key is None or key in self._current:
+            self.epoch = next(_epochs)
+            self._current = set()
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Default backend which keeps Python sets in CopyOnWriteDict.
+    """
+
+    def __init__(self, namespace: str = ''):
+        self.namespace = namespace
+        self._data: CopyOnWriteDict[Hashable, Members] = \
+            CopyOnWriteDict(copy=methodcaller('copy'))
+        self._invalidate()
+
+    def get(self, key: Hashable) -> Optional[Members]:
+        return self._data.get(key)
+
+    def add(
+        self,
+        key: Hashable,
+        member: t.Object,
+        factory: Callable[[], Members] = set
+    ) -> bool:
+        members = self._data.get(key)
+        if members is not None and member in members:
+            return False
+
+        self._data.mutable(key, factory).add(member)
+        return True
+
+    def remove(self, key: Hashable, member: t.Object):
+        members = self._data.get(key)
+        if members is None or member not in members:
+            raise KeyError(member)
+
+        self._data.mutable(key).remove(member)
+
+    def replace(self, key: Hashable, members: Optional[Members]):
+        data = self._data
+        if not members:
+            if key in data:
+                self.delete(key)
+            return
+
+        existing = data.get(key)
+        if type(existing) is set and type(members) is set and data.owns(key):
+            existing.clear()
+            existing.update(members)
+            return
+
+        self._invalidate(key)
+        data[key] = members
+
+    def delete(self, key: Hashable):
+        self._invalidate(key)
+        del self._data[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def keys(self) -> Iterator[Hashable]:
+        return self._data.keys()
+
+    def is_current(self, key: Hashable, members: Optional[Members]) -> bool:
+        """
+        Collections owned by this backend are modified in place until their
+        key is deleted or replaced or the backend is forked.
+        """
+        return members is not None and self._data.holds(key, members) and \
+            self._keep_current(key)
+
+    @property
+    def tombstones(self) -> int:
+        return self._data.tombstones
+
+    def compact(self) -> int:
+        return self._data.compact()
+
+    def fork(self) -> 'MemoryBackend':
+        forked = MemoryBackend(self.namespace)
+        forked._data = self._data.fork()
+        self._invalidate()
+        return forked
+
+
+BackendFactory = Callable[[str], StorageBackend]
@@ -0,0 +1,235 @@
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, \
+    Optional, Tuple, TypeVar
+from weakref import WeakSet
+
+__all__ = [
+    'CopyOnWriteDict',
+]
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_MISSING = object()
+_DELETED = object()
+
+
+class _Layer:
+    """
+    Frozen part of CopyOnWriteDict shared by forks. Modified only by merge
+    when a single dict depends on it.
+
+    dependants - dicts and layers which have this layer as parent.
+    size - number of entries in this layer and its parents.
+    """
+    __slots__ = ('data', 'parent', 'depth', 'size', 'dependants',
+                 '__weakref__')
+
+    def __init__(self, data: Dict, parent: Optional['_Layer']):
+        self.data = data
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 1
+        self.size = len(data) + (parent.size if parent else 0)
+        self.dependants = WeakSet()
+        if parent:
+            parent.dependants.add(self)
+
+    def merge(self, data: Dict):
+        own = self.data
+        parent = self.parent
+        for key, value in data.items():
+            if value is _DELETED and parent is None:
+                own.pop(key, None)
+            else:
+                own[key] = value
+        self.size = len(own) + (parent.size if parent else 0)
+
+
+class CopyOnWriteDict(Generic[K, V]):
+    """
+    Dict which can be forked in O(1).
+
+    Writes go to the local layer, reads fall through a chain of frozen layers
+    shared with other forks. Values taken from a frozen layer are copied with
+    `copy` before they are modified in place, see `mutable`. Keys deleted
+    while frozen layers still hold them leave tombstones, see `compact`.
+
+    Fork freezes the local layer, or merges it into the parent layer when no
+    other fork depends on that layer, so the chain grows only while forks
+    are kept and memory grows with changes made between forks.
+
+    Lookups through a chain deeper than MAX_DEPTH are counted and once they
+    have walked more layers than the chain has entries, the chain of this
+    dict is flattened into a single layer (values are shared).
+    """
+    MAX_DEPTH = 32
+
+    def __init__(self, copy: Optional[Callable[[V], V]] = None):
+        self._local: Dict[K, Any] = dict()
+        self._parent: Optional[_Layer] = None
+        self._copy = copy
+        self._debt = 0
+
+    def fork(self) -> 'CopyOnWriteDict[K, V]':
+        local = self._local
+        if local:
+            parent = self._parent
+            if parent and all(x is self for x in parent.dependants):
+                parent.merge(local)
+            else:
+                self._set_parent(_Layer(local, parent))
+            self._local = dict()
+
+        fork = CopyOnWriteDict(self._copy)
+        fork._set_parent(self._parent)
+        return fork
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        value = self._local.get(key, _MISSING)
+        if value is _MISSING and self._parent:
+            value = self._lookup(key)
+        if value is _MISSING or value is _DELETED:
+            return default
+        return value
+
+    def mutable(self, key: K, factory: Optional[Callable[[], V]] = None) -> V:
+        """
+        Get value owned by this dict so it can be modified in place.
+        Missing value is created with `factory` or KeyError is raised.
+        """
+        local = self._local
+        value = local.get(key, _MISSING)
+        if value is not _MISSING and value is not _DELETED:
+            return value
+
+        if value is _MISSING and self._parent:
+            value = self._lookup(key)
+
+        if value is _MISSING or value is _DELETED:
+            if factory is None:
+                raise KeyError(key)
+            value = factory()
+        elif self._copy:
+            value = self._copy(value)
+
+        local[key] = value
+        return value
+
+    def owns(self, key: K) -> bool:
+        """
+        Whether value of the key may be modified in place.
+        """
+        value = self._local.get(key, _MISSING)
+        return value is not _MISSING and value is not _DELETED
+
+    def holds(self, key: K, value: V) -> bool:
+        """
+        Whether the value is kept under the key by this dict itself.
+        """
+        return value is not _DELETED and \
+            self._local.get(key, _MISSING) is value
+
+    def __getitem__(self, key: K) -> V:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: K, value: V):
+        self._local[key] = value
+
+    def __delitem__(self, key: K):
+        if key not in self:
+            raise KeyError(key)
+        self._local.pop(key, None)
+        if self._parent:
+            value = self._lookup(key)
+            if value is not _MISSING and value is not _DELETED:
+                self._local[key] = _DELETED
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[K]:
+        return (key for key, _ in self._items())
+
+    def __len__(self) -> int:
+        if not self._parent:
+            return len(self._local)
+        return sum(1 for _ in self._items())
+
+    @property
+    def tombstones(self) -> int:
+        """
+        Number of keys deleted locally but still kept by frozen layers.
+        """
+        return sum(1 for x in self._local.values() if x is _DELETED)
+
+    def compact(self) -> int:
+        """
+        Drop tombstones by flattening frozen layers into one, O(number of
+        keys). Returns number of dropped tombstones.
+        """
+        tombstones = self.tombstones
+        if tombstones:
+            self._flatten()
+        return tombstones
+
+    def keys(self) -> Iterator[K]:
+        return iter(self)
+
+    def items(self) -> Iterator[Tuple[K, V]]:
+        return self._items()
+
+    def _set_parent(self, layer: Optional[_Layer]):
+        if self._parent:
+            self._parent.dependants.discard(self)
+        if layer:
+            layer.dependants.add(self)
+        self._parent = layer
+        self._debt = 0
+
+    def _flatten(self):
+        local = self._local
+        data = {
+            key: value for key, value in self._walk(dict(), self._parent)
+            if key not in local
+        }
+        self._set_parent(_Layer(data, None) if data else None)
+        for key in [x for x, value in local.items() if value is _DELETED]:
+            del local[key]
+
+    def _lookup(self, key: K) -> Any:
+        layer = self._parent
+        if layer.depth > self.MAX_DEPTH:
+            self._debt += layer.depth
+            if self._debt > layer.size:
+                self._flatten()
+                layer = self._parent
+
+        while layer:
+            value = layer.data.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            layer = layer.parent
+        return _MISSING
+
+    def _items(self) -> Iterator[Tuple[K, V]]:
+        if not self._parent:
+            return iter(self._local.items())
+        return self._walk(self._local, self._parent)
+
+    @staticmethod
+    def _walk(
+        data: Dict,
+        layer: Optional[_Layer]
+    ) -> Iterator[Tuple[K, V]]:
+        seen = set()
+        while data is not None:
+            for key, value in data.items():
+                if key in seen:
+                    continue
+                seen.add(key)
+                if value is not _DELETED:
+                    yield key, value
+            data = layer.data if layer else None
+            layer = layer.parent if layer else None
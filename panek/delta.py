@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from typing import AbstractSet, Callable, Dict, FrozenSet, Iterable, Optional
+from uuid import UUID
+
+import panek.typing as t
+
+__all__ = [
+    'EdgeDelta',
+    'Delta',
+]
+
+
+@dataclass(frozen=True)
+class EdgeDelta:
+    added: FrozenSet[t.Object]
+    removed: FrozenSet[t.Object]
+
+    @classmethod
+    def between(
+        cls,
+        before: Optional[AbstractSet[t.Object]],
+        after: Optional[AbstractSet[t.Object]]
+    ) -> Optional['EdgeDelta']:
+        if before is after:
+            return None
+
+        before = before or frozenset()
+        after = after or frozenset()
+        delta = cls(
+            added=frozenset(x for x in after if x not in before),
+            removed=frozenset(x for x in before if x not in after),
+        )
+        return delta if delta.added or delta.removed else None
+
+    @classmethod
+    def among(
+        cls,
+        members: Iterable[t.Object],
+        before: Callable[[t.Object], bool],
+        after: Callable[[t.Object], bool]
+    ) -> Optional['EdgeDelta']:
+        """
+        Changes of the given members only, `before` and `after` tell whether
+        a member is present.
+        """
+        added = set()
+        removed = set()
+        for member in members:
+            present = after(member)
+            if present != before(member):
+                (added if present else removed).add(member)
+
+        if not added and not removed:
+            return None
+        return cls(added=frozenset(added), removed=frozenset(removed))
+
+
+@dataclass
+class Delta:
+    """
+    relations - changes of relation members keyed by relation id.
+    types - changes of objects kept by type.
+    """
+    relations: Dict[UUID, EdgeDelta] = field(default_factory=dict)
+    types: Dict[t.ObjectType, EdgeDelta] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.relations or self.types)
@@ -4,6 +4,14 @@ __all__ = [
     'ManySameRelationsError',
     'MissingRelationError',
     'InvalidRelationError',
+    'DuplicateArchetypeError',
+    'MissingColumnError',
+    'ReplicationGapError',
+    'NoDefaultMapperError',
+    'UnboundRelationError',
+    'StorageNotEmptyError',
+    'ForkNotSupportedError',
+    'UnsupportedOrderError',
 ]
 
 
@@ -25,3 +33,35 @@ class MissingRelationError(ObjectRelationError):
 
 class InvalidRelationError(ObjectRelationError):
     pass
+
+
+class DuplicateArchetypeError(ObjectRelationError):
+    pass
+
+
+class MissingColumnError(ObjectRelationError):
+    pass
+
+
+class ReplicationGapError(ObjectRelationError):
+    pass
+
+
+class NoDefaultMapperError(ObjectRelationError):
+    pass
+
+
+class UnboundRelationError(ObjectRelationError):
+    pass
+
+
+class StorageNotEmptyError(ObjectRelationError):
+    pass
+
+
+class ForkNotSupportedError(ObjectRelationError):
+    pass
+
+
+class UnsupportedOrderError(ObjectRelationError):
+    pass
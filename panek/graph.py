@@ -0,0 +1,230 @@
+from abc import ABC
+from array import array
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Type
+
+import panek.typing as t
+from panek.relations import Relation
+
+__all__ = [
+    'AdjacencySnapshot',
+    'GraphAlgorithms',
+]
+
+RelationTypes = Optional[Tuple[Type[Relation], ...]]
+
+
+class AdjacencySnapshot:
+    """
+    Compact adjacency of objects linked by relations of chosen types.
+
+    Objects are numbered, neighbours of object `i` are
+    `targets[offsets[i]:offsets[i + 1]]`. Edges are undirected.
+    """
+
+    def __init__(
+        self,
+        objects: List[t.Object],
+        offsets: array,
+        targets: array,
+        version: int
+    ):
+        self.objects = objects
+        self.offsets = offsets
+        self.targets = targets
+        self.version = version
+        self.index: Dict[t.Object, int] = {
+            obj: i for i, obj in enumerate(objects)
+        }
+
+    @classmethod
+    def build(cls, orm, relation_types: RelationTypes) -> 'AdjacencySnapshot':
+        objects = list()
+        index = dict()
+        neighbours: List[Set[int]] = list()
+
+        def number(obj: t.Object) -> int:
+            i = index.get(obj)
+            if i is None:
+                i = index[obj] = len(objects)
+                objects.append(obj)
+                neighbours.append(set())
+            return i
+
+        container = orm._container
+        for obj, relation in orm._relations.items():
+            if relation_types and not isinstance(relation, relation_types):
+                continue
+            i = number(obj)
+            for related in container.iter_members(relation.id):
+                j = number(related)
+                neighbours[i].add(j)
+                neighbours[j].add(i)
+
+        offsets = array('q', [0])
+        targets = array('q')
+        for linked in neighbours:
+            targets.extend(linked)
+            offsets.append(len(targets))
+
+        return cls(objects, offsets, targets, orm.version)
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def neighbours(self, i: int) -> array:
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+
+class GraphAlgorithms(ABC):
+    """
+    Traversals over relations of ObjectRelationMapper.
+
+    They run on AdjacencySnapshot which is cached per relation types and
+    rebuilt only when version of the mapper has changed.
+
+    relation_types - follow only relations of these types, all by default.
+    """
+
+    def __init__(self):
+        self._adjacency: Dict[RelationTypes, AdjacencySnapshot] = dict()
+
+    def adjacency(
+        self,
+        relation_types: RelationTypes = None
+    ) -> AdjacencySnapshot:
+        snapshot = self._adjacency.get(relation_types)
+        if snapshot is None or snapshot.version != self.version:
+            snapshot = AdjacencySnapshot.build(self, relation_types)
+            self._adjacency[relation_types] = snapshot
+        return snapshot
+
+    def bfs(
+        self,
+        seed: t.Object,
+        depth: Optional[int] = None,
+        relation_types: RelationTypes = None
+    ) -> List[t.Object]:
+        """
+        Objects reachable from the seed within depth, in breadth first order.
+        """
+        snapshot = self.adjacency(relation_types)
+        if seed not in snapshot.index:
+            return [seed]
+        objects = snapshot.objects
+        return [objects[i] for i in self._bfs(snapshot, seed, depth)]
+
+    def dfs(
+        self,
+        seed: t.Object,
+        depth: Optional[int] = None,
+        relation_types: RelationTypes = None
+    ) -> List[t.Object]:
+        """
+        Objects reachable from the seed within depth, in depth first order.
+
+        With depth an object is expanded again when it is reached by a
+        shorter path, so no object within depth is missed.
+        """
+        snapshot = self.adjacency(relation_types)
+        start = snapshot.index.get(seed)
+        if start is None:
+            return [seed]
+
+        offsets = snapshot.offsets
+        targets = snapshot.targets
+        bounded = depth is not None
+        reached: List[Optional[int]] = [None] * len(snapshot)
+        order = list()
+        stack = [(start, 0)]
+        while stack:
+            i, level = stack.pop()
+            previous = reached[i]
+            if previous is not None and (not bounded or previous <= level):
+                continue
+            reached[i] = level
+            if previous is None:
+                order.append(snapshot.objects[i])
+            if bounded and level >= depth:
+                continue
+
+            level += 1
+            for j in reversed(targets[offsets[i]:offsets[i + 1]]):
+                previous = reached[j]
+                if previous is None or bounded and previous > level:
+                    stack.append((j, level))
+
+        return order
+
+    def is_reachable(
+        self,
+        source: t.Object,
+        target: t.Object,
+        depth: Optional[int] = None,
+        relation_types: RelationTypes = None
+    ) -> bool:
+        if source is target:
+            return True
+
+        snapshot = self.adjacency(relation_types)
+        goal = snapshot.index.get(target)
+        if goal is None:
+            return False
+        return any(i == goal for i in self._bfs(snapshot, source, depth))
+
+    def connected_components(
+        self,
+        relation_types: RelationTypes = None
+    ) -> List[Set[t.Object]]:
+        """
+        Groups of objects linked with each other, objects without any
+        relation are skipped.
+        """
+        snapshot = self.adjacency(relation_types)
+        objects = snapshot.objects
+        offsets = snapshot.offsets
+        targets = snapshot.targets
+        visited = bytearray(len(snapshot))
+        components = list()
+
+        for start in range(len(snapshot)):
+            if visited[start] or offsets[start] == offsets[start + 1]:
+                continue
+            visited[start] = 1
+            component = {objects[start]}
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if not visited[j]:
+                        visited[j] = 1
+                        component.add(objects[j])
+                        stack.append(j)
+            components.append(component)
+
+        return components
+
+    @staticmethod
+    def _bfs(
+        snapshot: AdjacencySnapshot,
+        seed: t.Object,
+        depth: Optional[int]
+    ) -> Iterator[int]:
+        start = snapshot.index.get(seed)
+        if start is None:
+            return
+
+        offsets = snapshot.offsets
+        targets = snapshot.targets
+        visited = bytearray(len(snapshot))
+        visited[start] = 1
+        queue = deque([(start, 0)])
+        while queue:
+            i, level = queue.popleft()
+            yield i
+            if depth is not None and level >= depth:
+                continue
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                if not visited[j]:
+                    visited[j] = 1
+                    queue.append((j, level + 1))
@@ -1,13 +1,25 @@
-from abc import ABC
+import itertools
+from copy import copy
 from dataclasses import dataclass
-from typing import Dict, Optional, Set
-from uuid import UUID
+from functools import partial
+from typing import Callable, Dict, Iterable, Optional, Set
 
 import panek.typing as t
-from panek.error import InvalidRelationError, ManySameRelationsError, \
-    MissingRelationError, SubstitutionNotAllowedError
-from panek.relations import ManyRelation, OneRelation, Relation
+from panek.archetypes import Archetype
+from panek.backends import BackendFactory, MemoryBackend, Members
+from panek.cow import CopyOnWriteDict
+from panek.delta import Delta, EdgeDelta
+from panek.error import DuplicateArchetypeError, InvalidRelationError, \
+    ManySameRelationsError, MissingRelationError, \
+    SubstitutionNotAllowedError, UnsupportedOrderError
+from panek.graph import GraphAlgorithms
+from panek.ordered import Cursor, OrderedMembers, Page
+from panek.reclaim import Reclaimer
+from panek.registry import register_default
+from panek.relations import ManyRelation, OneRelation, OrderedManyRelation, \
+    Relation
 from panek.utils import method_dispatch
+from panek.versions import ChangeKind, ChangeTracker
 
 __all__ = [
     'ObjectRelationMapper'
@@ -20,14 +32,14 @@ class RelationFields:
     rel2: Relation
 
 
-class RelationOperationsDispatcher(ABC):
+class RelationOperationsDispatcher(ChangeTracker):
     """
     Takes care of relation operations: get, add, remove.
     Every operation has method dispatch for OneRelation and ManyRelation.
     """
 
-    def __init__(self):
-        self._container: Dict[UUID, Set[t.Object]] = dict()
+    def __init__(self, backend: BackendFactory = MemoryBackend):
+        self._container = backend('relations')
 
     # GET #####################################################################
     @method_dispatch
@@ -45,6 +57,27 @@ class RelationOperationsDispatcher(ABC):
         obj = self._container.get(relation.id)
         return list(obj)[0] if obj else None
 
+    # ITERATE #################################################################
+    @method_dispatch
+    def iter_relation(
+        self,
+        relation: Relation,
+        after: Optional[Cursor] = None,
+        limit: Optional[int] = None
+    ) -> Page:
+        raise InvalidRelationError(
+            f'relation `{type(relation)}` is not ordered'
+        )
+
+    @iter_relation.register
+    def _iter_ordered(
+        self,
+        relation: OrderedManyRelation,
+        after: Optional[Cursor] = None,
+        limit: Optional[int] = None
+    ) -> Page:
+        return self._container.page(relation.id, after, limit)
+
     # ADD #####################################################################
     @method_dispatch
     def _add_relation(self, relation: Relation, related: t.Object):
@@ -54,16 +87,28 @@ class RelationOperationsDispatcher(ABC):
 
     @_add_relation.register
     def _many_add(self, relation: ManyRelation, related: t.Object):
+        factory = self._members_factory(relation)
+        if self._container.add(relation.id, related, factory):
+            self._touch(ChangeKind.RELATION, relation.id, added=(related,))
+
+    @_add_relation.register
+    def _one_add(self, relation: OneRelation, related: t.Object):
         container = self._container
         id_ = relation.id
+        removed = [x for x in container.iter_members(id_) if x is not related]
+        container.replace(id_, {related})
+        self._touch(ChangeKind.RELATION, id_, (related,), removed)
 
-        if id_ not in container.keys():
-            container[id_] = set()
-        container[id_].add(related)
+    @method_dispatch
+    def _members_factory(self, relation: Relation) -> Callable[[], Members]:
+        return set
 
-    @_add_relation.register
-    def _one_add(self, relation: OneRelation, related: t.Object):
-        self._container[relation.id] = {related}
+    @_members_factory.register
+    def _ordered_factory(
+        self,
+        relation: OrderedManyRelation
+    ) -> Callable[[], Members]:
+        return partial(OrderedMembers, relation.key)
 
     # REMOVE ##################################################################
     @method_dispatch
@@ -77,61 +122,202 @@ class RelationOperationsDispatcher(ABC):
         container = self._container
         id_ = relation.id
         try:
-            container[id_].remove(related)
+            container.remove(id_, related)
         except KeyError:
             raise MissingRelationError
+        self._touch(ChangeKind.RELATION, id_, removed=(related,))
 
     @_remove_relation.register
     def _one_remove(self, relation: OneRelation, related: t.Object):
         container = self._container
         id_ = relation.id
 
+        removed = list(container.iter_members(id_))
         try:
-            del container[id_]
+            container.delete(id_)
         except KeyError:
             raise MissingRelationError
+        self._touch(ChangeKind.RELATION, id_, removed=removed)
 
 
-class ObjectsContainer(ABC):
+class ObjectsContainer(ChangeTracker):
     """
     Holds objects of the same type.
     Keeps self._add_objects and self._remove_objects as protected methods.
+
+    Optionally mirrors chosen attributes of a type into an Archetype which is
+    kept in sync with self._objects.
     """
 
-    def __init__(self):
-        self._objects: Dict[t.ObjectType, Set[t.Object]] = dict()
+    def __init__(self, backend: BackendFactory = MemoryBackend):
+        self._objects = backend('types')
+        self._archetypes: Dict[t.ObjectType, Archetype] = dict()
 
     def get_type(self, type_: t.ObjectType) -> Set[t.Object]:
         return self._objects.get(type_) or set()
 
+    def register_archetype(
+        self,
+        type_: t.ObjectType,
+        *attributes: str,
+        typecodes: Optional[Dict[str, str]] = None
+    ) -> Archetype:
+        if type_ in self._archetypes:
+            raise DuplicateArchetypeError(
+                f'archetype for `{type_.__name__}` is already registered'
+            )
+
+        archetype = Archetype(type_, attributes, typecodes)
+        for obj in self.get_type(type_):
+            archetype._append(obj)
+        self._archetypes[type_] = archetype
+
+        return archetype
+
+    def get_archetype(self, type_: t.ObjectType) -> Optional[Archetype]:
+        return self._archetypes.get(type_)
+
+    def _check_archetypes(self, *objects: t.Object):
+        """
+        Read rows of objects new to their archetypes, so a value which does
+        not fit its column fails before anything is modified.
+        """
+        archetypes = self._archetypes
+        for obj in objects:
+            archetype = archetypes.get(type(obj))
+            if archetype is not None and obj not in archetype:
+                archetype._read(obj)
+
     def _add_objects(self, *objects: t.Object):
         objects_dict = self._objects
+        archetypes = self._archetypes
         for obj in objects:
             type_id = type(obj)
-            if type_id not in objects_dict.keys():
-                objects_dict[type_id] = set()
-            objects_dict[type_id].add(obj)
+            if not objects_dict.add(type_id, obj):
+                continue
+            self._touch(ChangeKind.TYPE, type_id, added=(obj,))
+
+            if type_id in archetypes:
+                archetypes[type_id]._append(obj)
 
     def _remove_objects(self, *objects: t.Object):
         objects_dict = self._objects
+        archetypes = self._archetypes
         for obj in objects:
-            objects_dict[type(obj)].remove(obj)
+            type_id = type(obj)
+            objects_dict.remove(type_id, obj)
+            self._touch(ChangeKind.TYPE, type_id, removed=(obj,))
 
+            if type_id in archetypes:
+                archetypes[type_id]._swap_remove(obj)
 
-class ObjectRelationMapper(RelationOperationsDispatcher, ObjectsContainer):
+
+class ObjectRelationMapper(
+    RelationOperationsDispatcher,
+    ObjectsContainer,
+    GraphAlgorithms,
+    Reclaimer
+):
     """
     Entry class to keep all objects bounded in relations.
     Ensures that objects are kept equally on the both sides of relations
+
+    backend - factory of StorageBackend called with namespace,
+    `relations` and `types` namespaces are used.
     """
-    def __init__(self):
-        RelationOperationsDispatcher.__init__(self)
-        ObjectsContainer.__init__(self)
-        self._relations: Dict[int, Relation] = dict()
+    def __init__(self, backend: BackendFactory = MemoryBackend):
+        ChangeTracker.__init__(self)
+        Reclaimer.__init__(self)
+        RelationOperationsDispatcher.__init__(self, backend)
+        ObjectsContainer.__init__(self, backend)
+        GraphAlgorithms.__init__(self)
+        self._relations: CopyOnWriteDict[t.Object, Relation] = \
+            CopyOnWriteDict()
+
+    def register_default(self):
+        """
+        Let relations perform actions directly with this mapper.
+        """
+        register_default(self)
+
+    def bind(self, *objects: t.Object):
+        """
+        Bind relations of objects which were not added yet to their owners.
+        """
+        for obj in objects:
+            self._seek_relations(obj)
+
+    def fork(self) -> 'ObjectRelationMapper':
+        """
+        Get logically independent mapper in O(1).
+
+        Internal structures are shared with the fork and copied per relation
+        or per type only when either side modifies them.
+        """
+        forked = copy(self)
+        forked._container = self._container.fork()
+        forked._objects = self._objects.fork()
+        forked._archetypes = {
+            type_: archetype.fork()
+            for type_, archetype in self._archetypes.items()
+        }
+        forked._relations = self._relations.fork()
+        forked._adjacency = dict(self._adjacency)
+        self._fork_changes(forked)
+        self._fork_reclaimable(forked)
+        return forked
+
+    def diff(self, other: 'ObjectRelationMapper') -> Delta:
+        """
+        Get changes which turn this mapper into the other one.
+
+        For mappers forked from each other (directly or through common
+        ancestor) only relations and types changed since they diverged are
+        compared, and only their members which have changed. Unrelated
+        mappers are compared in full.
+        """
+        delta = Delta()
+        storages = {
+            ChangeKind.RELATION:
+                (delta.relations, self._container, other._container),
+            ChangeKind.TYPE: (delta.types, self._objects, other._objects),
+        }
+
+        changes = self._changed_between(other)
+        if changes is None:
+            for result, before, after in storages.values():
+                for key in set(itertools.chain(before.keys(), after.keys())):
+                    edges = EdgeDelta.between(before.get(key), after.get(key))
+                    if edges:
+                        result[key] = edges
+            return delta
+
+        for (kind, key), members in changes.items():
+            if kind not in storages:
+                continue
+            result, before, after = storages[kind]
+            edges = EdgeDelta.among(
+                members,
+                partial(before.has_member, key),
+                partial(after.has_member, key),
+            )
+            if edges:
+                result[key] = edges
+
+        return delta
 
     def _seek_relations(self, obj: t.Object) -> Relation:
+        self._reclaimable.pop((ChangeKind.OBJECT, obj), None)
         return self._relations.get(obj) or self._setup_relation(obj)
 
-    def _setup_relation(self, obj: t.Object) -> Relation:
+    def _relation_of(self, obj: t.Object) -> Relation:
+        """
+        Relation of the object without setting it up.
+        """
+        return self._relations.get(obj) or self._find_relation(obj)
+
+    @staticmethod
+    def _find_relation(obj: t.Object) -> Relation:
         relations = {
             getattr(obj, x) for x in dir(obj)
             if isinstance(getattr(obj, x), Relation)
@@ -140,8 +326,19 @@ class ObjectRelationMapper(RelationOperationsDispatcher, ObjectsContainer):
         if not len(relations) == 1:
             raise ManySameRelationsError
 
-        relation = relations.pop()
+        return relations.pop()
+
+    def _setup_relation(self, obj: t.Object) -> Relation:
+        relation = self._find_relation(obj)
+        if isinstance(relation, OrderedManyRelation) and \
+                relation.key is not None and not self._container.KEY_ORDER:
+            raise UnsupportedOrderError(
+                f'`{type(self._container).__name__}` does not keep members '
+                f'ordered by key'
+            )
+        relation._bind(obj)
         self._relations[obj] = relation
+        self._touch(ChangeKind.OBJECT, obj)
 
         return relation
 
@@ -173,6 +370,7 @@ class ObjectRelationMapper(RelationOperationsDispatcher, ObjectsContainer):
                 raise SubstitutionNotAllowedError
             relation = self._relations[self.get_relation(one_relation)]
             self._remove_relation(relation, to_remove)
+            self._release_relation(relation)
 
     def _ensure_substitution(
         self,
@@ -205,7 +403,66 @@ class ObjectRelationMapper(RelationOperationsDispatcher, ObjectsContainer):
 
         self._one_to_many_substitution(one_relation, to_remove)
 
+    # APPLY ###################################################################
+    def _apply_relation(
+        self,
+        relation: Relation,
+        added: Iterable[t.Object],
+        removed: Iterable[t.Object]
+    ):
+        """
+        Apply replicated changes of relation members, added members are
+        added in the given order. Members added again are moved to the end.
+        """
+        container = self._container
+        id_ = relation.id
+        removed = [x for x in removed if container.has_member(id_, x)]
+        moved = [x for x in added if container.has_member(id_, x)]
+        for member in itertools.chain(removed, moved):
+            container.remove(id_, member)
+        factory = self._members_factory(relation)
+        added = [x for x in added if container.add(id_, x, factory)]
+        if not added and not removed:
+            return
+
+        self._touch(ChangeKind.RELATION, id_, added, removed)
+        if removed:
+            self._release_relation(relation)
+
+    def _apply_type(
+        self,
+        type_: t.ObjectType,
+        added: Iterable[t.Object],
+        removed: Iterable[t.Object]
+    ):
+        """
+        Apply replicated changes of objects kept by the type.
+        """
+        objects = self._objects
+        for obj in removed:
+            if objects.has_member(type_, obj):
+                self._release_object(obj)
+        self._add_objects(*added)
+
+    # RECLAIM #################################################################
+    def _release_relation(self, relation: Relation):
+        id_ = relation.id
+        container = self._container
+        if id_ in container and self._is_empty(container, id_):
+            self._mark_reclaimable(ChangeKind.RELATION, id_)
+
+    def _release_object(self, obj: t.Object):
+        """
+        Remove object left without relations from its type.
+        """
+        self._remove_objects(obj)
+        self._mark_reclaimable(ChangeKind.OBJECT, obj)
+        type_ = type(obj)
+        if self._is_empty(self._objects, type_):
+            self._mark_reclaimable(ChangeKind.TYPE, type_)
+
     def add(self, obj1: t.Object1, obj2: t.Object2):
+        self._check_archetypes(obj1, obj2)
         relations = self._get_relations(obj1, obj2)
         self._ensure_substitution(obj1, obj2, relations)
         self._add_relation(relations.rel1, obj2)
@@ -218,6 +475,8 @@ class ObjectRelationMapper(RelationOperationsDispatcher, ObjectsContainer):
         self._remove_relation(relations.rel2, obj1)
 
         if not self.get_relation(relations.rel1):
-            self._remove_objects(obj1)
+            self._release_relation(relations.rel1)
+            self._release_object(obj1)
         if not self.get_relation(relations.rel2):
-            self._remove_objects(obj2)
+            self._release_relation(relations.rel2)
+            self._release_object(obj2)
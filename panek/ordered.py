@@ -0,0 +1,164 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableSet
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import panek.typing as t
+
+__all__ = [
+    'OrderedMembers',
+    'Page',
+]
+
+Cursor = Any
+
+
+@dataclass(frozen=True)
+class Page:
+    """
+    cursor - pass as `after` to get the next page, None if there is no more.
+    """
+    items: List[t.Object]
+    cursor: Optional[Cursor]
+
+
+class OrderedMembers(MutableSet):
+    """
+    Set which keeps members in insertion order or ordered by `key`.
+
+    Every member gets unique sort key, the insertion sequence or
+    (key(member), sequence). Sort keys are kept in sorted buckets of at most
+    2 * LOAD entries next to the members, so adding or removing a member
+    costs a bisect and a shift within one bucket and a page after any sort
+    key is found with bisect.
+    """
+    LOAD = 512
+
+    def __init__(
+        self,
+        key: Optional[Callable[[t.Object], Any]] = None,
+        members: Iterable[t.Object] = ()
+    ):
+        self.key = key
+        self._positions: Dict[t.Object, Cursor] = dict()
+        self._orders: List[List[Cursor]] = list()
+        self._members: List[List[t.Object]] = list()
+        self._maxes: List[Cursor] = list()
+        self._sequence = 0
+        for member in members:
+            self.add(member)
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[t.Object]) -> set:
+        return set(iterable)
+
+    def __contains__(self, member: t.Object) -> bool:
+        return member in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[t.Object]:
+        for members in self._members:
+            yield from members
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def add(self, member: t.Object):
+        if member in self._positions:
+            return
+
+        self._sequence += 1
+        if self.key:
+            position = (self.key(member), self._sequence)
+        else:
+            position = self._sequence
+        self._positions[member] = position
+
+        orders = self._orders
+        maxes = self._maxes
+        if not maxes or maxes[-1] < position:
+            if not orders or len(orders[-1]) >= self.LOAD:
+                orders.append(list())
+                self._members.append(list())
+                maxes.append(position)
+            orders[-1].append(position)
+            self._members[-1].append(member)
+            maxes[-1] = position
+            return
+
+        b = bisect_left(maxes, position)
+        order = orders[b]
+        i = bisect_right(order, position)
+        order.insert(i, position)
+        self._members[b].insert(i, member)
+        if len(order) > 2 * self.LOAD:
+            self._split(b)
+
+    def discard(self, member: t.Object):
+        position = self._positions.pop(member, None)
+        if position is None:
+            return
+
+        b = bisect_left(self._maxes, position)
+        order = self._orders[b]
+        i = bisect_left(order, position)
+        del order[i]
+        del self._members[b][i]
+
+        if not order:
+            del self._orders[b]
+            del self._members[b]
+            del self._maxes[b]
+        elif i == len(order):
+            self._maxes[b] = order[-1]
+
+    def copy(self) -> 'OrderedMembers':
+        copied = OrderedMembers(self.key)
+        copied._positions = dict(self._positions)
+        copied._orders = [list(x) for x in self._orders]
+        copied._members = [list(x) for x in self._members]
+        copied._maxes = list(self._maxes)
+        copied._sequence = self._sequence
+        return copied
+
+    def page(
+        self,
+        after: Optional[Cursor] = None,
+        limit: Optional[int] = None
+    ) -> Page:
+        """
+        Members after the cursor, O(log n + limit).
+        """
+        orders = self._orders
+        b = i = 0
+        if after is not None:
+            b = bisect_right(self._maxes, after)
+            if b < len(orders):
+                i = bisect_right(orders[b], after)
+
+        items = list()
+        cursor = after
+        while b < len(orders):
+            order = orders[b]
+            stop = len(order)
+            if limit is not None:
+                stop = min(stop, i + limit - len(items))
+            items.extend(self._members[b][i:stop])
+            if stop > i:
+                cursor = order[stop - 1]
+            if stop < len(order):
+                return Page(items=items, cursor=cursor)
+            b += 1
+            i = 0
+
+        return Page(items=items, cursor=None)
+
+    def _split(self, b: int):
+        order = self._orders[b]
+        members = self._members[b]
+        half = len(order) // 2
+        self._orders[b:b + 1] = [order[:half], order[half:]]
+        self._members[b:b + 1] = [members[:half], members[half:]]
+        self._maxes.insert(b, order[half - 1])
@@ -0,0 +1,158 @@
+import sys
+from abc import ABC
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterator, Tuple
+
+from panek.versions import ChangeKind
+
+__all__ = [
+    'MapperStats',
+    'Reclaimer',
+]
+
+_MISSING = object()
+
+Entry = Tuple[ChangeKind, Hashable]
+
+
+@dataclass(frozen=True)
+class MapperStats:
+    """
+    relations, types, objects - entries kept by the mapper.
+    empty_relations, empty_types - empty collections left after removal.
+    stale_objects - objects without any relation still known by the mapper.
+    pending - entries waiting for reclamation.
+    reclaimable_bytes - size of empty collections.
+    tombstones - deleted keys remembered for forks, dropped by compact.
+    changes - entries of the change log, see ChangeTracker.
+    """
+    relations: int
+    types: int
+    objects: int
+    empty_relations: int
+    empty_types: int
+    stale_objects: int
+    pending: int
+    reclaimable_bytes: int
+    tombstones: int
+    changes: int
+
+
+class Reclaimer(ABC):
+    """
+    Drops empty relations, empty types and objects without relations of
+    ObjectRelationMapper.
+
+    Emptied entries are queued and the older half of the queue is reclaimed
+    when it grows over RECLAIM_THRESHOLD. Entries refilled in the meantime
+    are kept, so relations which are often emptied and refilled keep their
+    collections instead of allocating new ones.
+    """
+    RECLAIM_THRESHOLD = 1024
+
+    def __init__(self):
+        self._reclaimable: Dict[Entry, None] = OrderedDict()
+
+    def compact(self, changes_before: int = None) -> int:
+        """
+        Reclaim all empty entries, drop tombstones left after forks and
+        forget changes no fork or replication leader needs now, returns
+        number of reclaimed entries and dropped tombstones.
+
+        changes_before - forget changes up to this version instead. Mappers
+        diverged before it are compared in full by diff and followers behind
+        it receive the whole state.
+        """
+        self._reclaimable.clear()
+        reclaimed = 0
+        for kind, key, _ in list(self._reclaimable_entries()):
+            self._reclaim(kind, key)
+            reclaimed += 1
+
+        reclaimed += self._container.compact()
+        reclaimed += self._objects.compact()
+        reclaimed += self._relations.compact()
+
+        if changes_before is None:
+            self._prune_retained()
+        else:
+            self._prune_changes(changes_before)
+
+        return reclaimed
+
+    def stats(self) -> MapperStats:
+        counts = {kind: 0 for kind in ChangeKind}
+        size = 0
+        for kind, _, entry_size in self._reclaimable_entries():
+            counts[kind] += 1
+            size += entry_size
+
+        return MapperStats(
+            relations=sum(1 for _ in self._container.keys()),
+            types=sum(1 for _ in self._objects.keys()),
+            objects=len(self._relations),
+            empty_relations=counts[ChangeKind.RELATION],
+            empty_types=counts[ChangeKind.TYPE],
+            stale_objects=counts[ChangeKind.OBJECT],
+            pending=len(self._reclaimable),
+            reclaimable_bytes=size,
+            tombstones=self._container.tombstones +
+            self._objects.tombstones + self._relations.tombstones,
+            changes=self._log_size(),
+        )
+
+    def _fork_reclaimable(self, forked: 'Reclaimer'):
+        forked._reclaimable = OrderedDict(self._reclaimable)
+
+    def _mark_reclaimable(self, kind: ChangeKind, key: Hashable):
+        pending = self._reclaimable
+        entry = (kind, key)
+        pending[entry] = None
+        pending.move_to_end(entry)
+
+        if len(pending) > self.RECLAIM_THRESHOLD:
+            for _ in range(len(pending) // 2):
+                (kind, key), _ = pending.popitem(last=False)
+                if self._is_reclaimable(kind, key):
+                    self._reclaim(kind, key)
+
+    def _is_reclaimable(self, kind: ChangeKind, key: Hashable) -> bool:
+        if kind is ChangeKind.RELATION:
+            return key in self._container and \
+                self._is_empty(self._container, key)
+        if kind is ChangeKind.TYPE:
+            return key in self._objects and self._is_empty(self._objects, key)
+
+        relation = self._relations.get(key)
+        return relation is not None and \
+            self._is_empty(self._container, relation.id) and \
+            key not in (self._objects.get(type(key)) or ())
+
+    def _reclaim(self, kind: ChangeKind, key: Hashable):
+        if kind is ChangeKind.RELATION:
+            self._container.delete(key)
+        elif kind is ChangeKind.TYPE:
+            self._objects.delete(key)
+        else:
+            del self._relations[key]
+            self._container.release(key)
+            self._objects.release(key)
+        self._touch(kind, key)
+
+    def _reclaimable_entries(
+        self
+    ) -> Iterator[Tuple[ChangeKind, Hashable, int]]:
+        for kind, storage in ((ChangeKind.RELATION, self._container),
+                              (ChangeKind.TYPE, self._objects)):
+            for key in storage.keys():
+                if self._is_empty(storage, key):
+                    yield kind, key, sys.getsizeof(storage.get(key))
+
+        for obj, _ in self._relations.items():
+            if self._is_reclaimable(ChangeKind.OBJECT, obj):
+                yield ChangeKind.OBJECT, obj, 0
+
+    @staticmethod
+    def _is_empty(storage, key: Hashable) -> bool:
+        return next(iter(storage.iter_members(key)), _MISSING) is _MISSING
@@ -0,0 +1,30 @@
+from panek.error import NoDefaultMapperError
+
+__all__ = [
+    'register_default',
+    'unregister_default',
+    'get_default',
+]
+
+_default = None
+
+
+def register_default(mapper):
+    """
+    Let Relation perform actions directly with the mapper.
+    """
+    global _default
+    _default = mapper
+
+
+def unregister_default():
+    global _default
+    _default = None
+
+
+def get_default():
+    if _default is None:
+        raise NoDefaultMapperError(
+            'register mapper with ObjectRelationMapper.register_default()'
+        )
+    return _default
@@ -1,26 +1,94 @@
 from abc import ABC
 from dataclasses import dataclass, field
-
+from typing import Any, Callable, Collection, Optional
 from uuid import UUID, uuid4
 
+from panek.error import UnboundRelationError
+from panek.registry import get_default
+
 __all__ = [
     'Relation',
     'ManyRelation',
+    'OrderedManyRelation',
     'OneRelation',
 ]
 
 
 @dataclass(frozen=True)
 class Relation(ABC):
+    """
+    With mapper registered as default relation performs actions directly:
+        person.houses.add(house)
+        person.houses.all()
+
+    Owner of the relation is bound when the mapper meets it for the first
+    time, see ObjectRelationMapper.bind. Storage slot of the relation is
+    cached on the relation with epoch of the storage and reused until the
+    epoch changes, see StorageBackend.epoch.
+    """
     to_type: type
     id: UUID = field(default_factory=uuid4, init=False)
 
+    _owner = None
+    _slot = None
+
+    @property
+    def owner(self):
+        if self._owner is None:
+            raise UnboundRelationError(
+                f'relation `{self.id}` is not bound to any object'
+            )
+        return self._owner
+
+    def all(self) -> Collection:
+        return self._get_slot() or frozenset()
+
+    def first(self):
+        return next(iter(self._get_slot() or ()), None)
+
+    def add(self, related):
+        get_default().add(self.owner, related)
+
+    def remove(self, related):
+        get_default().remove(self.owner, related)
+
+    def _bind(self, owner):
+        object.__setattr__(self, '_owner', owner)
+
+    def _get_slot(self) -> Optional[Collection]:
+        container = get_default()._container
+        cached = self._slot
+        if cached is not None and cached[0] == container.epoch:
+            return cached[1]
+
+        slot = container.get(self.id)
+        if container.is_current(self.id, slot):
+            object.__setattr__(self, '_slot', (container.epoch, slot))
+        return slot
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_slot', None)
+        return state
+
 
 @dataclass(frozen=True)
 class ManyRelation(Relation):
     to_type: type
 
 
+@dataclass(frozen=True)
+class OrderedManyRelation(ManyRelation):
+    """
+    key - order members by key of the member instead of insertion order.
+
+    Members can be iterated page by page with
+    ObjectRelationMapper.iter_relation.
+    """
+    to_type: type
+    key: Optional[Callable[[Any], Any]] = None
+
+
 @dataclass(frozen=True)
 class OneRelation(Relation):
     """
@@ -0,0 +1,255 @@
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, \
+    Tuple
+from uuid import UUID
+
+import panek.typing as t
+from panek.error import ReplicationGapError
+from panek.object_relations import ObjectRelationMapper
+from panek.relations import Relation
+from panek.versions import ChangeKind
+
+__all__ = [
+    'DeltaBatch',
+    'ReplicationLeader',
+    'ReplicationFollower',
+]
+
+Refs = Tuple[UUID, ...]
+Edges = Tuple[Refs, Refs]
+Event = Tuple[int, ChangeKind, Hashable, Any, bool]
+
+
+@dataclass(frozen=True)
+class DeltaBatch:
+    """
+    Members of relations and types changed between `since` and `version`.
+
+    Objects are referenced by id of their own relation and sent only once,
+    in `objects`, when the leader meets them for the first time.
+    Relations and types map to (added, removed) references, added ones in
+    the order they were added. Objects reclaimed by the leader are listed in
+    `released`, so the follower can forget their references.
+
+    reset - batch holds the whole state as added members, everything else is
+    gone. Sent to followers behind changes already forgotten by the leader.
+    """
+    since: int
+    version: int
+    objects: Dict[UUID, t.Object]
+    relations: Dict[UUID, Edges]
+    types: Dict[t.ObjectType, Edges]
+    final: bool
+    reset: bool = False
+    released: Refs = ()
+
+
+class ReplicationLeader:
+    """
+    Produces DeltaBatch from versions of the mapper.
+    Cost depends on number of members changed since follower's version only.
+
+    The mapper keeps changes since the version the leader was last asked
+    for, so use one leader per follower.
+    """
+
+    def __init__(self, orm: ObjectRelationMapper, batch_size: int = 1024):
+        self.orm = orm
+        self.batch_size = batch_size
+
+    def batches(self, since: int = 0) -> Iterator[DeltaBatch]:
+        orm = self.orm
+        if since < orm._horizon:
+            orm._retain(self, orm.version)
+            yield self._snapshot(since)
+            return
+
+        events = sorted(self._events(since), key=itemgetter(0))
+        if not events:
+            orm._retain(self, since)
+            yield self._batch(since, orm.version, [], final=True)
+            return
+
+        start = 0
+        while start < len(events):
+            end = min(start + self.batch_size, len(events))
+            while end < len(events) and events[end][0] == events[end - 1][0]:
+                end += 1
+            final = end == len(events)
+            version = orm.version if final else events[end - 1][0]
+            orm._retain(self, since)
+            yield self._batch(since, version, events[start:end], final)
+            since = version
+            start = end
+
+    def send(self, connection, since: int = 0) -> int:
+        """
+        Send batches through `connection` with multiprocessing Connection
+        interface. Returns version the follower is synced to.
+        """
+        version = since
+        for batch in self.batches(since):
+            connection.send(batch)
+            version = batch.version
+        return version
+
+    def _events(self, since: int) -> Iterator[Event]:
+        orm = self.orm
+        for change in orm._changed_since(since):
+            kind, key = change
+            if kind is ChangeKind.OBJECT:
+                yield orm._changes[change], kind, key, None, True
+                continue
+            for member, version, present in \
+                    orm._changed_members(change, since):
+                yield version, kind, key, member, present
+
+    def _batch(
+        self,
+        since: int,
+        version: int,
+        events: List[Event],
+        final: bool
+    ) -> DeltaBatch:
+        orm = self.orm
+        objects = dict()
+        released = list()
+        edges = {ChangeKind.RELATION: dict(), ChangeKind.TYPE: dict()}
+
+        for _, kind, key, member, present in events:
+            if kind is ChangeKind.OBJECT:
+                relation = orm._relations.get(key)
+                if relation:
+                    objects[relation.id] = key
+                else:
+                    released.append(key)
+                continue
+
+            members = edges[kind].get(key)
+            if members is None:
+                members = edges[kind][key] = (list(), list())
+            members[0 if present else 1].append(member)
+
+        relations, types = (
+            {
+                key: (self._refs(added), self._refs(removed))
+                for key, (added, removed) in edges[kind].items()
+            }
+            for kind in (ChangeKind.RELATION, ChangeKind.TYPE)
+        )
+        return DeltaBatch(
+            since=since,
+            version=version,
+            objects=objects,
+            relations=relations,
+            types=types,
+            final=final,
+            released=self._refs(released),
+        )
+
+    def _snapshot(self, since: int) -> DeltaBatch:
+        orm = self.orm
+        return DeltaBatch(
+            since=since,
+            version=orm.version,
+            objects={x.id: obj for obj, x in orm._relations.items()},
+            relations={
+                key: (self._refs(orm._container.iter_members(key)), ())
+                for key in orm._container.keys()
+            },
+            types={
+                key: (self._refs(orm._objects.iter_members(key)), ())
+                for key in orm._objects.keys()
+            },
+            final=True,
+            reset=True,
+        )
+
+    def _refs(self, members: Iterable[t.Object]) -> Refs:
+        relation_of = self.orm._relation_of
+        return tuple(relation_of(x).id for x in members)
+
+
+class ReplicationFollower:
+    """
+    Applies DeltaBatch in bulk to its own mapper.
+
+    Keeps the version it is synced to, so after falling behind it only
+    needs batches since that version.
+
+    Edges of relations whose owner was never sent are skipped, the owner
+    was reclaimed by the leader before the follower met it.
+    """
+
+    def __init__(self, orm: Optional[ObjectRelationMapper] = None):
+        self.orm = orm or ObjectRelationMapper()
+        self.version = 0
+        self._objects: Dict[UUID, t.Object] = dict()
+
+    def apply(self, batch: DeltaBatch):
+        if batch.since > self.version:
+            raise ReplicationGapError(
+                f'batch since {batch.since} does not follow {self.version}'
+            )
+
+        orm = self.orm
+        if batch.reset:
+            self._reset(batch)
+        objects = self._objects
+
+        for ref, obj in batch.objects.items():
+            obj = objects.setdefault(ref, obj)
+            orm._seek_relations(obj)
+
+        for id_, (added, removed) in batch.relations.items():
+            if id_ not in objects:
+                continue
+            orm._apply_relation(
+                self._relation(id_),
+                self._members(added),
+                self._members(removed),
+            )
+        for type_, (added, removed) in batch.types.items():
+            orm._apply_type(
+                type_, self._members(added), self._members(removed)
+            )
+
+        for ref in batch.released:
+            obj = objects.pop(ref, None)
+            if obj is not None:
+                orm._release_relation(orm._relation_of(obj))
+                orm._mark_reclaimable(ChangeKind.OBJECT, obj)
+
+        self.version = max(self.version, batch.version)
+
+    def receive(self, connection) -> int:
+        """
+        Apply batches from `connection` until the final one.
+        """
+        while True:
+            batch = connection.recv()
+            self.apply(batch)
+            if batch.final:
+                return self.version
+
+    def _reset(self, batch: DeltaBatch):
+        orm = self.orm
+        for id_ in list(orm._container.keys()):
+            members = list(orm._container.iter_members(id_))
+            orm._apply_relation(self._relation(id_), (), members)
+        for type_ in list(orm._objects.keys()):
+            members = list(orm._objects.iter_members(type_))
+            orm._apply_type(type_, (), members)
+
+        objects = self._objects
+        self._objects = {
+            ref: objects.get(ref, obj) for ref, obj in batch.objects.items()
+        }
+
+    def _relation(self, ref: UUID) -> Relation:
+        return self.orm._relation_of(self._objects[ref])
+
+    def _members(self, refs: Refs) -> List[t.Object]:
+        objects = self._objects
+        return [objects[x] for x in refs if x in objects]
@@ -0,0 +1,351 @@
+import itertools
+import sqlite3
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Set, \
+    Tuple
+
+import panek.typing as t
+from panek.backends import Members, StorageBackend
+from panek.error import StorageNotEmptyError
+from panek.ordered import Cursor, Page
+
+__all__ = [
+    'SQLiteStorage',
+    'SQLiteBackend',
+]
+
+_MISSING = object()
+
+
+class SQLiteStorage:
+    """
+    Keeps members of every namespace in one SQLite file.
+
+    Use the instance as `backend` of ObjectRelationMapper:
+        ObjectRelationMapper(backend=SQLiteStorage('graph.db'))
+
+    Only edges are stored in the file. Objects and keys stay in memory and
+    edges reference them by integer ids assigned on first use, so the file is
+    scratch storage of one mapper. Tables already holding edges are not
+    reused, StorageNotEmptyError is raised instead. By default a private
+    temporary file is used which is deleted on close.
+
+    Ids of objects reclaimed by the mapper and of deleted keys are released.
+
+    cache_size - number of hot keys kept materialised per namespace.
+    batch_size - number of writes buffered before they are executed.
+    """
+
+    def __init__(
+        self,
+        path: str = '',
+        cache_size: int = 1024,
+        batch_size: int = 1024
+    ):
+        self.connection = sqlite3.connect(path)
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.backends: List['SQLiteBackend'] = list()
+        self._refs: Dict[t.Object, int] = dict()
+        self._objects: Dict[int, t.Object] = dict()
+        self._next_ref = itertools.count()
+        self._next_seq = itertools.count()
+
+    def __call__(self, namespace: str) -> 'SQLiteBackend':
+        backend = SQLiteBackend(self, namespace)
+        self.backends.append(backend)
+        return backend
+
+    def flush(self):
+        for backend in self.backends:
+            backend._execute_pending()
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def _ref(self, obj: t.Object) -> int:
+        ref = self._refs.get(obj)
+        if ref is None:
+            ref = self._refs[obj] = next(self._next_ref)
+            self._objects[ref] = obj
+        return ref
+
+    def _release(self, obj: t.Object):
+        ref = self._refs.pop(obj, None)
+        if ref is not None:
+            del self._objects[ref]
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores (key, member, seq) rows of one namespace in its own table.
+
+    Writes are buffered and executed in batches. Buffered members are
+    tracked per key, so membership is checked without executing the buffer
+    and it is executed only before queries of keys it writes to. The most
+    recently used keys are kept materialised in LRU cache which is updated
+    on write.
+
+    Keys are mapped to integer ids in memory, a key emptied by removing its
+    members is kept until it is deleted, like in MemoryBackend.
+
+    Members are kept in insertion order only, OrderedManyRelation with `key`
+    is not supported.
+    """
+    KEY_ORDER = False
+
+    def __init__(self, storage: SQLiteStorage, namespace: str):
+        self.storage = storage
+        self.namespace = namespace
+        self._table = f'panek_{namespace}'
+        self._cache: Dict[Hashable, Optional[Members]] = OrderedDict()
+        self._key_ids: Dict[Hashable, int] = dict()
+        self._keys: Dict[int, Hashable] = dict()
+        self._next_key = itertools.count()
+        self._pending: List[Tuple[str, tuple]] = list()
+        self._pending_members: Dict[int, Dict[int, bool]] = dict()
+        self._pending_cleared: Set[int] = set()
+        self._invalidate()
+
+        table = self._table
+        connection = storage.connection
+        connection.executescript(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                key INTEGER NOT NULL,
+                member INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (key, member)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS {table}_seq ON {table} (key, seq);
+        ''')
+        if connection.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone():
+            raise StorageNotEmptyError(
+                f'table `{table}` already holds edges of another mapper'
+            )
+        self._insert = f'INSERT OR IGNORE INTO {table} VALUES (?, ?, ?)'
+        self._delete_member = \
+            f'DELETE FROM {table} WHERE key = ? AND member = ?'
+        self._delete_key = f'DELETE FROM {table} WHERE key = ?'
+
+    # READ ####################################################################
+    def get(self, key: Hashable) -> Optional[Members]:
+        cache = self._cache
+        members = cache.get(key, _MISSING)
+        if members is not _MISSING:
+            cache.move_to_end(key)
+            return members
+
+        members = set(self.iter_members(key)) or None
+        self._cache_put(key, members)
+        return members
+
+    def iter_members(self, key: Hashable) -> Iterator[t.Object]:
+        members = self._cache.get(key, _MISSING)
+        if members is not _MISSING:
+            return iter(members or ())
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return iter(())
+        return self._stream(
+            f'SELECT member FROM {self._table} WHERE key = ? ORDER BY seq',
+            (key_id,),
+        )
+
+    def page(
+        self,
+        key: Hashable,
+        after: Optional[Cursor] = None,
+        limit: Optional[int] = None
+    ) -> Page:
+        """
+        Members in insertion order, the cursor is `seq` of the last member.
+        """
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return Page(items=list(), cursor=None)
+        self._sync(key_id)
+        rows = self.storage.connection.execute(
+            f'SELECT member, seq FROM {self._table} '
+            f'WHERE key = ? AND seq > ? ORDER BY seq LIMIT ?',
+            (key_id, -1 if after is None else after,
+             -1 if limit is None else limit + 1),
+        ).fetchall()
+
+        cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            cursor = rows[-1][1] if rows else after
+
+        objects = self.storage._objects
+        return Page(items=[objects[x] for x, _ in rows], cursor=cursor)
+
+    def has_member(self, key: Hashable, member: t.Object) -> bool:
+        members = self._cache.get(key, _MISSING)
+        if members is not _MISSING:
+            return bool(members) and member in members
+
+        ref = self.storage._refs.get(member)
+        key_id = self._key_ids.get(key)
+        if ref is None or key_id is None:
+            return False
+
+        present = self._pending_members.get(key_id, {}).get(ref)
+        if present is not None:
+            return present
+        if key_id in self._pending_cleared:
+            return False
+
+        cursor = self.storage.connection.execute(
+            f'SELECT 1 FROM {self._table} WHERE key = ? AND member = ?',
+            (key_id, ref),
+        )
+        return cursor.fetchone() is not None
+
+    def is_current(self, key: Hashable, members: Optional[Members]) -> bool:
+        """
+        Cached collections are updated on write until they are evicted or
+        replaced.
+        """
+        return members is not None and self._cache.get(key) is members and \
+            self._keep_current(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._key_ids
+
+    def keys(self) -> Iterator[Hashable]:
+        return iter(list(self._key_ids))
+
+    # WRITE ###################################################################
+    def add(
+        self,
+        key: Hashable,
+        member: t.Object,
+        factory: Callable[[], Members] = set
+    ) -> bool:
+        if self.has_member(key, member):
+            return False
+
+        members = self._cache.get(key, _MISSING)
+        if members is None:
+            self._cache[key] = members = factory()
+        if members is not _MISSING:
+            members.add(member)
+
+        storage = self.storage
+        key_id = self._key_id(key)
+        ref = storage._ref(member)
+        self._pending_members.setdefault(key_id, dict())[ref] = True
+        self._write(self._insert, (key_id, ref, next(storage._next_seq)))
+        return True
+
+    def remove(self, key: Hashable, member: t.Object):
+        if not self.has_member(key, member):
+            raise KeyError(member)
+
+        members = self._cache.get(key)
+        if members:
+            members.remove(member)
+            if not members:
+                self._cache[key] = None
+                self._invalidate(key)
+
+        key_id = self._key_ids[key]
+        ref = self.storage._ref(member)
+        self._pending_members.setdefault(key_id, dict())[ref] = False
+        self._write(self._delete_member, (key_id, ref))
+
+    def replace(self, key: Hashable, members: Optional[Members]):
+        storage = self.storage
+        if not members:
+            if key in self._key_ids:
+                self._clear(key)
+                self._release_key(key)
+            self._cache_put(key, None)
+            return
+
+        key_id = self._key_id(key)
+        written = self._clear(key)
+        for member in members:
+            ref = storage._ref(member)
+            written[ref] = True
+            self._write(self._insert, (key_id, ref, next(storage._next_seq)))
+        self._cache_put(key, members)
+
+    def delete(self, key: Hashable):
+        if key not in self:
+            raise KeyError(key)
+        self._clear(key)
+        self._release_key(key)
+        self._cache_put(key, None)
+
+    def release(self, obj: t.Object):
+        self.storage._release(obj)
+
+    def flush(self):
+        self.storage.flush()
+
+    # INTERNAL ################################################################
+    def _key_id(self, key: Hashable) -> int:
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = next(self._next_key)
+            self._keys[key_id] = key
+        return key_id
+
+    def _release_key(self, key: Hashable):
+        key_id = self._key_ids.pop(key, None)
+        if key_id is not None:
+            del self._keys[key_id]
+
+    def _cache_put(self, key: Hashable, members: Optional[Members]):
+        cache = self._cache
+        self._invalidate(key)
+        cache[key] = members
+        cache.move_to_end(key)
+        while len(cache) > self.storage.cache_size:
+            evicted, _ = cache.popitem(last=False)
+            self._invalidate(evicted)
+
+    def _clear(self, key: Hashable) -> Dict[int, bool]:
+        key_id = self._key_ids[key]
+        self._pending_cleared.add(key_id)
+        written = self._pending_members[key_id] = dict()
+        self._write(self._delete_key, (key_id,))
+        return written
+
+    def _write(self, statement: str, parameters: tuple):
+        self._pending.append((statement, parameters))
+        if len(self._pending) >= self.storage.batch_size:
+            self._execute_pending()
+
+    def _execute_pending(self):
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = list()
+        self._pending_members = dict()
+        self._pending_cleared = set()
+
+        execute = self.storage.connection.executemany
+        for statement, group in itertools.groupby(pending, lambda x: x[0]):
+            execute(statement, [parameters for _, parameters in group])
+
+    def _sync(self, key_id: int):
+        """
+        Execute buffered writes if any of them writes to the key.
+        """
+        if key_id in self._pending_members:
+            self._execute_pending()
+
+    def _stream(self, query: str, parameters: tuple) -> Iterator[t.Object]:
+        self._sync(parameters[0])
+        objects = self.storage._objects
+        cursor = self.storage.connection.execute(query, parameters)
+        rows = cursor.fetchmany(self.storage.batch_size)
+        while rows:
+            for row in rows:
+                yield objects[row[0]]
+            rows = cursor.fetchmany(self.storage.batch_size)
+
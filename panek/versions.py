@@ -0,0 +1,207 @@
+from abc import ABC
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Hashable, Iterable, Iterator, List, MutableMapping, \
+    Optional, Set, Tuple
+from weakref import WeakKeyDictionary, ref
+
+__all__ = [
+    'ChangeKind',
+    'ChangeTracker',
+]
+
+
+class ChangeKind(Enum):
+    RELATION = 'relation'
+    TYPE = 'type'
+    OBJECT = 'object'
+
+
+Change = Tuple[ChangeKind, Hashable]
+MemberLog = Dict[Hashable, Tuple[int, bool]]
+
+
+class ChangeTracker(ABC):
+    """
+    Counts modifications and keeps the version of the latest change of
+    every key. self._changes is ordered by version, so keys changed since
+    any version are found without scanning unchanged ones.
+
+    Members added to or removed from a key are logged the same way in
+    self._members, with the version of their latest change and whether they
+    are present after it, so changes of a key cost as much as the members
+    changed rather than its size.
+
+    Forks start with an empty log and remember the version they were forked
+    at in self._origin. The log is complete for changes after
+    self._horizon only, older changes may be pruned.
+
+    Whenever CHANGES_LIMIT or as many versions as the log has entries have
+    passed, the log is pruned up to the oldest version still needed: versions
+    kept in self._retained by live forks and replication leaders. A fork
+    keeps its whole log while the mapper it was forked from is alive.
+    """
+    CHANGES_LIMIT = 4096
+
+    def __init__(self):
+        self._version = 0
+        self._horizon = 0
+        self._created = 0
+        self._changes: Dict[Change, int] = OrderedDict()
+        self._members: Dict[Change, MemberLog] = dict()
+        self._origin: Optional[Tuple[ref, int]] = None
+        self._retained: MutableMapping[Hashable, int] = WeakKeyDictionary()
+        self._prune_at = self.CHANGES_LIMIT
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _touch(
+        self,
+        kind: ChangeKind,
+        key: Hashable,
+        added: Iterable[Hashable] = (),
+        removed: Iterable[Hashable] = ()
+    ):
+        self._version += 1
+        version = self._version
+        change = (kind, key)
+        changes = self._changes
+        changes[change] = version
+        changes.move_to_end(change)
+        if version >= self._prune_at:
+            self._prune_retained()
+
+        if not added and not removed:
+            return
+        log = self._members.get(change)
+        if log is None:
+            log = self._members[change] = OrderedDict()
+        for member in removed:
+            log[member] = (version, False)
+            log.move_to_end(member)
+        for member in added:
+            log[member] = (version, True)
+            log.move_to_end(member)
+
+    def _fork_changes(self, forked: 'ChangeTracker'):
+        forked._changes = OrderedDict()
+        forked._members = dict()
+        forked._origin = (ref(self), self._version)
+        forked._horizon = forked._created = self._version
+        forked._retained = WeakKeyDictionary()
+        forked._prune_at = self._version + self.CHANGES_LIMIT
+        self._retain(forked, self._version)
+
+    def _retain(self, holder: Hashable, version: int):
+        """
+        Keep changes after version while the holder is alive.
+        """
+        self._retained[holder] = version
+
+    def _retained_version(self) -> int:
+        versions = list(self._retained.values())
+        origin = self._origin
+        if origin and origin[0]() is not None:
+            versions.append(self._created)
+        return min(versions, default=self._version)
+
+    def _prune_retained(self):
+        self._prune_changes(self._retained_version())
+        self._prune_at = self._version + max(
+            self.CHANGES_LIMIT, self._log_size()
+        )
+
+    def _prune_changes(self, version: int):
+        changes = self._changes
+        members = self._members
+        while changes and next(iter(changes.values())) <= version:
+            change, _ = changes.popitem(last=False)
+            members.pop(change, None)
+        for log in members.values():
+            while log and next(iter(log.values()))[0] <= version:
+                log.popitem(last=False)
+        self._horizon = max(self._horizon, min(version, self._version))
+
+    def _log_size(self) -> int:
+        return len(self._changes) + \
+            sum(len(x) for x in self._members.values())
+
+    def _changed_since(self, version: int) -> Iterator[Change]:
+        """
+        Changes newer than version, the most recent first.
+        """
+        for change, changed in reversed(self._changes.items()):
+            if changed <= version:
+                break
+            yield change
+
+    def _changed_members(
+        self,
+        change: Change,
+        version: int
+    ) -> Iterator[Tuple[Hashable, int, bool]]:
+        """
+        Members of the key changed after version with version of the change
+        and their presence, the most recent first.
+        """
+        log = self._members.get(change)
+        if not log:
+            return
+        for member, (changed, present) in reversed(log.items()):
+            if changed <= version:
+                break
+            yield member, changed, present
+
+    def _lineage(self) -> List[Tuple['ChangeTracker', int]]:
+        lineage = [(self, self._version)]
+        origin = self._origin
+        while origin:
+            parent = origin[0]()
+            if parent is None:
+                break
+            lineage.append((parent, origin[1]))
+            origin = parent._origin
+        return lineage
+
+    def _changed_between(
+        self,
+        other: 'ChangeTracker'
+    ) -> Optional[Dict[Change, Set[Hashable]]]:
+        """
+        Superset of keys which may differ between self and other, each with
+        superset of its members which may differ. None if mappers have no
+        common ancestor or required changes were pruned.
+        """
+        lineage = self._lineage()
+        other_lineage = other._lineage()
+        positions = {id(tracker): i for i, (tracker, _) in enumerate(lineage)}
+
+        for other_i, (common, other_version) in enumerate(other_lineage):
+            if id(common) in positions:
+                break
+        else:
+            return None
+
+        i = positions[id(common)]
+        version = lineage[i][1]
+        diverged = [tracker for tracker, _ in lineage[:i]]
+        diverged += [tracker for tracker, _ in other_lineage[:other_i]]
+
+        since = min(version, other_version)
+        if common._horizon > since:
+            return None
+        if any(x._horizon > x._created for x in diverged):
+            return None
+
+        changes = {
+            change: {x for x, _, _ in common._changed_members(change, since)}
+            for change in common._changed_since(since)
+        }
+        for tracker in diverged:
+            for change in tracker._changes:
+                changes.setdefault(change, set()).update(
+                    tracker._members.get(change, ())
+                )
+        return changes
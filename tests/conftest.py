@@ -3,7 +3,7 @@ from typing import List, Tuple
 import pytest
 
 from panek.object_relations import ObjectRelationMapper
-from panek.relations import OneRelation, ManyRelation
+from panek.relations import OneRelation, ManyRelation, OrderedManyRelation
 
 SAMPLE_SIZE = 50
 
@@ -148,6 +148,36 @@ class Author:
         self.books: ManyRelation = ManyRelation(to_type=Book)
 
 
+class Squad:
+    def __init__(self):
+        self.units: ManyRelation = ManyRelation(to_type=Unit)
+
+
+class Unit:
+    def __init__(self, x: float = 0.0, y: float = 0.0):
+        self.squad: OneRelation = OneRelation(to_type=Squad)
+        self.x = x
+        self.y = y
+
+
+class Street:
+    def __init__(self):
+        self.houses: OrderedManyRelation = OrderedManyRelation(to_type=IHouse)
+
+
+class NumberedStreet:
+    def __init__(self):
+        self.houses: OrderedManyRelation = OrderedManyRelation(
+            to_type=NumberedHouse, key=lambda x: x.number
+        )
+
+
+class NumberedHouse:
+    def __init__(self, number: int):
+        self.street: OneRelation = OneRelation(to_type=NumberedStreet)
+        self.number = number
+
+
 # typing
 TestObjects = Tuple[ObjectRelationMapper, Person, List[House]]
 TestPersonSsn = Tuple[ObjectRelationMapper, SsnPerson, Ssn]
@@ -0,0 +1,78 @@
+import pytest
+
+from panek.error import DuplicateArchetypeError, MissingColumnError
+from tests.conftest import SAMPLE_SIZE, Squad, Unit
+
+
+def test_register_archetype_backfills(orm):
+    squad = Squad()
+    units = [Unit(x=i, y=-i) for i in range(SAMPLE_SIZE)]
+    for unit in units:
+        orm.add(squad, unit)
+
+    archetype = orm.register_archetype(Unit, 'x', 'y')
+
+    assert orm.get_archetype(Unit) is archetype
+    assert len(archetype) == SAMPLE_SIZE
+    assert set(archetype) == set(units)
+    assert sorted(archetype.column('x')) == list(range(SAMPLE_SIZE))
+
+    with pytest.raises(DuplicateArchetypeError):
+        orm.register_archetype(Unit, 'x')
+
+
+def test_archetype_columns_follow_objects(orm):
+    archetype = orm.register_archetype(Unit, 'x', 'y', typecodes={'x': 'd'})
+    squad = Squad()
+    units = [Unit(x=i, y=-i) for i in range(SAMPLE_SIZE)]
+    for unit in units:
+        orm.add(squad, unit)
+
+    assert len(archetype) == SAMPLE_SIZE
+    assert orm.get_archetype(Squad) is None
+
+    for unit in units[::2]:
+        orm.remove(squad, unit)
+
+    xs = archetype.column('x')
+    ys = archetype.column('y')
+    assert len(xs) == len(ys) == len(archetype) == SAMPLE_SIZE // 2
+    for unit in units[1::2]:
+        row = archetype.row(unit)
+        assert archetype.entities[row] is unit
+        assert xs[row] == unit.x
+        assert ys[row] == unit.y
+    assert all(unit not in archetype for unit in units[::2])
+
+    with pytest.raises(MissingColumnError):
+        archetype.column('z')
+
+
+def test_archetype_load_store(orm):
+    archetype = orm.register_archetype(Unit, 'x')
+    unit = Unit(x=1)
+    orm.add(Squad(), unit)
+
+    unit.x = 5
+    archetype.load(unit)
+    assert archetype.column('x')[archetype.row(unit)] == 5
+
+    archetype.column('x')[archetype.row(unit)] = 7
+    archetype.store()
+    assert unit.x == 7
+
+
+def test_archetype_rejects_bad_value(orm):
+    archetype = orm.register_archetype(Unit, 'x', 'y', typecodes={'y': 'd'})
+    squad = Squad()
+    orm.add(squad, Unit(x=1, y=1))
+    unit = Unit(x=2, y='bad')
+
+    with pytest.raises(TypeError):
+        orm.add(squad, unit)
+
+    assert len(archetype) == len(archetype.column('x')) == 1
+    assert len(archetype.column('y')) == 1
+    assert unit not in archetype
+    assert unit not in orm.get_type(Unit)
+    assert unit not in orm.get_relation(squad.units)
@@ -0,0 +1,115 @@
+import pickle
+
+import pytest
+
+from panek.error import NoDefaultMapperError, UnboundRelationError
+from panek.registry import unregister_default
+from tests.conftest import House, Person, SAMPLE_SIZE, Street
+
+
+@pytest.fixture
+def default_orm(orm):
+    orm.register_default()
+    yield orm
+    unregister_default()
+
+
+def test_no_default_mapper():
+    with pytest.raises(NoDefaultMapperError):
+        Person().houses.all()
+
+
+def test_unbound_relation(default_orm):
+    with pytest.raises(UnboundRelationError):
+        Person().houses.add(House())
+
+
+def test_bound_relation(default_orm):
+    orm = default_orm
+    person = Person()
+    orm.bind(person)
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+
+    assert person.houses.all() == frozenset()
+    assert person.houses.first() is None
+
+    for house in houses:
+        person.houses.add(house)
+
+    assert person.houses.all() == set(houses)
+    assert person.houses.all() is orm.get_relation(person.houses)
+    assert all(x.person.first() is person for x in houses)
+    assert houses[0].person.owner is houses[0]
+
+    houses[0].person.remove(person)
+    assert houses[0] not in person.houses.all()
+    assert houses[0].person.first() is None
+    assert len(person.houses.all()) == SAMPLE_SIZE - 1
+
+
+def test_slot_follows_fork(default_orm):
+    orm = default_orm
+    street = Street()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(street, house)
+    assert street.houses.first() is houses[0]
+
+    fork = orm.fork()
+    fork.register_default()
+    street.houses.remove(houses[0])
+    assert street.houses.first() is houses[1]
+
+    orm.register_default()
+    assert street.houses.first() is houses[0]
+    assert len(street.houses.all()) == SAMPLE_SIZE
+
+
+def test_pickle_skips_slot(default_orm):
+    person = Person()
+    default_orm.add(person, House())
+    person.houses.all()
+
+    copied = pickle.loads(pickle.dumps(person))
+    assert copied.houses._slot is None
+    assert copied.houses.owner is copied
+
+
+def test_slot_survives_churn(default_orm, monkeypatch):
+    orm = default_orm
+    person = Person()
+    orm.add(person, House())
+    slot = person.houses.all()
+
+    for _ in range(SAMPLE_SIZE):
+        other = Person()
+        house = House()
+        orm.add(other, house)
+        orm.remove(other, house)
+
+    def lookup(*args):
+        raise AssertionError('slot was looked up again')
+
+    monkeypatch.setattr(orm._container, 'get', lookup)
+    monkeypatch.setattr(orm._container, 'is_current', lookup)
+    monkeypatch.setattr(orm._container, 'has_member', lookup)
+    assert person.houses.all() is slot
+    assert person.houses.first() in slot
+
+
+def test_slot_invalidated_by_delete(default_orm, monkeypatch):
+    orm = default_orm
+    monkeypatch.setattr(orm, 'RECLAIM_THRESHOLD', 1)
+    person, house = Person(), House()
+    orm.add(person, house)
+    kept = Person()
+    orm.add(kept, House())
+    slot = kept.houses.all()
+    assert house.person.first() is person
+    assert person.houses.all() == {house}
+
+    orm.remove(person, house)
+    assert house.person.first() is None
+    assert not person.houses.all()
+    assert person.houses.id not in orm._container
+    assert kept.houses.all() is slot
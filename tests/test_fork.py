@@ -0,0 +1,145 @@
+from panek.cow import CopyOnWriteDict
+from tests.conftest import Author, Book, House, Person, SAMPLE_SIZE, \
+    Squad, TestObjects, Unit
+
+
+def test_fork_is_independent(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    fork = orm.fork()
+
+    new_house = House()
+    fork.add(person, new_house)
+    fork.remove(person, houses[0])
+
+    assert len(orm.get_relation(person.houses)) == SAMPLE_SIZE
+    assert houses[0] in orm.get_relation(person.houses)
+    assert new_house not in orm.get_relation(person.houses)
+    assert orm.get_relation(new_house.person) is None
+    assert orm.get_relation(houses[0].person) is person
+    assert new_house not in orm.get_type(House)
+
+    assert len(fork.get_relation(person.houses)) == SAMPLE_SIZE
+    assert houses[0] not in fork.get_relation(person.houses)
+    assert fork.get_relation(new_house.person) is person
+    assert fork.get_relation(houses[0].person) is None
+    assert houses[0] not in fork.get_type(House)
+
+
+def test_parent_changes_do_not_leak(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    fork = orm.fork()
+
+    for house in houses:
+        orm.remove(person, house)
+
+    assert not orm.get_type(Person)
+    assert len(fork.get_relation(person.houses)) == SAMPLE_SIZE
+    assert fork.get_type(Person) == {person}
+
+
+def test_many_forks(orm):
+    author = Author()
+    forks = list()
+    for _ in range(CopyOnWriteDict.MAX_DEPTH * 2):
+        orm.add(author, Book())
+        forks.append(orm.fork())
+
+    for size, fork in enumerate(forks, start=1):
+        assert len(fork.get_relation(author.books)) == size
+        assert len(fork.get_type(Book)) == size
+
+
+def test_fork_archetype(orm):
+    squad = Squad()
+    units = [Unit(x=i) for i in range(SAMPLE_SIZE)]
+    for unit in units:
+        orm.add(squad, unit)
+    archetype = orm.register_archetype(Unit, 'x')
+
+    fork = orm.fork()
+    fork.remove(squad, units[0])
+
+    assert len(archetype) == SAMPLE_SIZE
+    assert units[0] in archetype
+    assert len(fork.get_archetype(Unit)) == SAMPLE_SIZE - 1
+    assert units[0] not in fork.get_archetype(Unit)
+
+
+def test_cow_dict_delete():
+    parent = CopyOnWriteDict(copy=set.copy)
+    parent.mutable('a', set).add(1)
+    child = parent.fork()
+
+    del child['a']
+    assert 'a' not in child
+    assert len(child) == 0
+    assert parent['a'] == {1}
+
+    child.mutable('a', set).add(2)
+    assert child['a'] == {2}
+    assert parent['a'] == {1}
+    assert dict(child.items()) == {'a': {2}}
+
+
+def test_fork_keeps_archetype_columns(orm):
+    squad = Squad()
+    archetype = orm.register_archetype(Unit, 'x')
+    for i in range(3):
+        orm.add(squad, Unit(x=i))
+    xs = archetype.column('x')
+
+    fork = orm.fork()
+    second = fork.fork()
+    orm.add(squad, Unit(x=3))
+    xs[0] = 12345
+
+    assert list(archetype.column('x')) == [12345, 1, 2, 3]
+    assert archetype.column('x') is xs
+    assert list(fork.get_archetype(Unit).column('x')) == [0, 1, 2]
+    assert list(second.get_archetype(Unit).column('x')) == [0, 1, 2]
+
+
+def test_fork_isolated_from_written_columns(orm):
+    squad = Squad()
+    archetype = orm.register_archetype(Unit, 'x', typecodes={'x': 'd'})
+    for i in range(3):
+        orm.add(squad, Unit(x=i))
+    xs = archetype.column('x')
+
+    fork = orm.fork()
+    xs[0] = 999.0
+    assert list(fork.get_archetype(Unit).column('x')) == [0.0, 1.0, 2.0]
+
+    forked_xs = fork.get_archetype(Unit).column('x')
+    second = fork.fork()
+    forked_xs[1] = 999.0
+    assert list(second.get_archetype(Unit).column('x')) == [0.0, 1.0, 2.0]
+    assert list(archetype.column('x')) == [999.0, 1.0, 2.0]
+
+
+def test_cow_dict_merges_discarded_forks():
+    data = CopyOnWriteDict()
+    kept = data.fork()
+    for i in range(CopyOnWriteDict.MAX_DEPTH * 4):
+        data[i] = i
+        data.fork()
+
+    assert data._parent.depth == 1
+    assert dict(data.items()) == {i: i for i in range(len(data))}
+    assert len(data) == CopyOnWriteDict.MAX_DEPTH * 4
+    assert len(kept) == 0
+
+
+def test_cow_dict_flattens_on_lookups():
+    depth = CopyOnWriteDict.MAX_DEPTH * 2
+    data = CopyOnWriteDict()
+    forks = list()
+    for i in range(depth):
+        data[i] = i
+        forks.append(data.fork())
+    assert data._parent.depth == depth
+
+    for i in range(depth):
+        assert data[i] == i
+    assert data._parent.depth == 1
+    assert all(len(x) == size for size, x in enumerate(forks, start=1))
@@ -0,0 +1,105 @@
+from panek.relations import ManyRelation
+from tests.conftest import Author, Book, House, Person, SAMPLE_SIZE
+
+
+def _chain(orm, size):
+    """
+    author0 - book0 - author1 - book1 - ...
+    """
+    authors = [Author() for _ in range(size)]
+    books = [Book() for _ in range(size)]
+    for i, book in enumerate(books):
+        orm.add(authors[i], book)
+        if i + 1 < size:
+            orm.add(authors[i + 1], book)
+    return authors, books
+
+
+def test_bfs_dfs(orm):
+    authors, books = _chain(orm, 5)
+
+    assert orm.bfs(authors[0]) == [
+        authors[0], books[0], authors[1], books[1], authors[2], books[2],
+        authors[3], books[3], authors[4], books[4],
+    ]
+    assert orm.bfs(authors[0], depth=2) == [authors[0], books[0], authors[1]]
+    assert set(orm.dfs(authors[2])) == set(authors) | set(books)
+    assert orm.dfs(authors[2], depth=1)[0] is authors[2]
+    assert len(orm.dfs(authors[2], depth=1)) == 3
+    assert orm.dfs(authors[2], depth=0) == [authors[2]]
+
+    stranger = Author()
+    assert orm.bfs(stranger) == orm.dfs(stranger) == [stranger]
+
+
+def test_reachability(orm):
+    authors, books = _chain(orm, 5)
+    lonely_author = Author()
+    orm.add(lonely_author, Book())
+
+    assert orm.is_reachable(authors[0], books[4])
+    assert not orm.is_reachable(authors[0], books[4], depth=8)
+    assert orm.is_reachable(authors[0], books[4], depth=9)
+    assert not orm.is_reachable(authors[0], lonely_author)
+
+    orm.add(lonely_author, books[4])
+    assert orm.is_reachable(authors[0], lonely_author)
+
+
+def test_connected_components(orm):
+    people = [Person() for _ in range(3)]
+    groups = list()
+    for person in people:
+        houses = {House() for _ in range(SAMPLE_SIZE)}
+        for house in houses:
+            orm.add(person, house)
+        groups.append(houses | {person})
+
+    components = orm.connected_components()
+    assert sorted(components, key=len) == sorted(groups, key=len)
+
+    house = next(iter(groups[0] - {people[0]}))
+    orm.remove(people[0], house)
+    components = orm.connected_components()
+    assert len(components) == 3
+    assert all(house not in x for x in components)
+
+
+def test_relation_types(orm):
+    person = Person()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(person, house)
+
+    components = orm.connected_components(relation_types=(ManyRelation,))
+    assert components == [set(houses) | {person}]
+
+
+def test_adjacency_cache(orm):
+    authors, books = _chain(orm, 3)
+
+    snapshot = orm.adjacency()
+    assert orm.adjacency() is snapshot
+    orm.remove(authors[1], books[0])
+    assert orm.adjacency() is not snapshot
+    assert not orm.is_reachable(authors[0], books[2])
+
+
+def test_dfs_depth_shorter_path(orm):
+    """
+    book2 is reached at the depth limit through book1 first, its neighbours
+    are reachable within depth through the direct edge only.
+    """
+    authors = [Author() for _ in range(3)]
+    books = [Book() for _ in range(4)]
+    orm.add(authors[0], books[1])
+    orm.add(authors[1], books[1])
+    orm.add(authors[1], books[2])
+    orm.add(authors[0], books[2])
+    orm.add(authors[2], books[2])
+    orm.add(authors[2], books[3])
+
+    found = orm.dfs(authors[0], depth=3)
+    assert len(found) == len(set(found))
+    assert set(found) == set(orm.bfs(authors[0], depth=3))
+    assert set(found) == set(authors) | set(books[1:])
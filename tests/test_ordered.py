@@ -0,0 +1,113 @@
+import pytest
+
+from panek.error import InvalidRelationError, UnsupportedOrderError
+from panek.object_relations import ObjectRelationMapper
+from panek.ordered import OrderedMembers
+from panek.sqlite import SQLiteStorage
+from tests.conftest import House, NumberedHouse, NumberedStreet, Person, \
+    SAMPLE_SIZE, Street
+
+
+def _pages(orm, relation, limit):
+    pages = list()
+    cursor = None
+    while True:
+        page = orm.iter_relation(relation, after=cursor, limit=limit)
+        pages.append(page.items)
+        cursor = page.cursor
+        if cursor is None:
+            return pages
+
+
+def test_insertion_order(orm):
+    street = Street()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(street, house)
+
+    assert list(orm.get_relation(street.houses)) == houses
+    pages = _pages(orm, street.houses, 7)
+    assert all(len(x) == 7 for x in pages[:-1])
+    assert sum(pages, []) == houses
+
+    for house in houses[::3]:
+        orm.remove(street, house)
+    expected = [x for x in houses if x not in houses[::3]]
+    assert sum(_pages(orm, street.houses, 7), []) == expected
+    assert len(orm.get_relation(street.houses)) == len(expected)
+    assert houses[0] not in orm.get_relation(street.houses)
+
+    orm.add(street, houses[0])
+    assert list(orm.get_relation(street.houses))[-1] is houses[0]
+
+
+def test_cursor_survives_removal(orm):
+    street = Street()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(street, house)
+
+    page = orm.iter_relation(street.houses, limit=10)
+    orm.remove(street, page.items[-1])
+    page = orm.iter_relation(street.houses, after=page.cursor, limit=10)
+    assert page.items == houses[10:20]
+
+
+def test_key_order(orm):
+    street = NumberedStreet()
+    houses = [NumberedHouse((i * 7) % SAMPLE_SIZE) for i in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(street, house)
+
+    numbers = [x.number for x in sum(_pages(orm, street.houses, 6), [])]
+    assert numbers == sorted(x.number for x in houses)
+    assert orm.get_relation(street.houses) == set(houses)
+
+
+def test_unordered_relation(orm):
+    person = Person()
+    orm.add(person, House())
+    with pytest.raises(InvalidRelationError):
+        orm.iter_relation(person.houses)
+
+
+def test_sqlite_pages(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'panek.db'), batch_size=4)
+    orm = ObjectRelationMapper(backend=storage)
+    street = Street()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(street, house)
+    orm.remove(street, houses[0])
+
+    assert sum(_pages(orm, street.houses, 8), []) == houses[1:]
+
+    house = NumberedHouse(1)
+    with pytest.raises(UnsupportedOrderError):
+        orm.add(house, NumberedStreet())
+    assert orm.get_relation(house.street) is None
+    assert not orm.get_type(NumberedHouse)
+    storage.close()
+
+
+def test_ordered_members_buckets(monkeypatch):
+    monkeypatch.setattr(OrderedMembers, 'LOAD', 4)
+    members = OrderedMembers(key=lambda x: x % 10)
+    for i in range(SAMPLE_SIZE):
+        members.add(i)
+
+    expected = sorted(range(SAMPLE_SIZE), key=lambda x: (x % 10, x))
+    assert list(members) == expected
+    assert all(len(x) <= 8 for x in members._orders)
+
+    for i in expected[:SAMPLE_SIZE - 3]:
+        members.discard(i)
+        page = members.page(limit=2)
+        assert page.items == [x for x in expected if x in members][:2]
+    assert len(members._orders) == 1
+    assert list(members) == expected[-3:]
+
+    copied = members.copy()
+    copied.discard(expected[-1])
+    assert list(members) == expected[-3:]
+    assert list(copied) == expected[-3:-1]
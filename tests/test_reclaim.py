@@ -0,0 +1,197 @@
+import gc
+from weakref import ref
+
+from panek.object_relations import ObjectRelationMapper
+from panek.replication import ReplicationFollower, ReplicationLeader
+from tests.conftest import Author, Book, House, Person, SAMPLE_SIZE, \
+    TestObjects
+
+
+def _remove_all(orm, person, houses):
+    for house in houses:
+        orm.remove(person, house)
+
+
+def test_compact(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    _remove_all(orm, person, houses)
+
+    stats = orm.stats()
+    assert stats.empty_relations == 1
+    assert stats.empty_types == 2
+    assert stats.stale_objects == SAMPLE_SIZE + 1
+    assert stats.reclaimable_bytes > 0
+
+    assert orm.compact() == SAMPLE_SIZE + 4
+    stats = orm.stats()
+    assert stats.relations == stats.types == stats.objects == 0
+    assert stats.reclaimable_bytes == stats.pending == 0
+    assert orm.get_relation(person.houses) is None
+    assert not orm.get_type(House)
+
+    orm.add(person, houses[0])
+    assert orm.get_relation(person.houses) == {houses[0]}
+    assert orm.get_relation(houses[0].person) is person
+
+
+def test_reclaim_on_churn(orm, monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 16)
+    for _ in range(SAMPLE_SIZE):
+        author = Author()
+        book = Book()
+        orm.add(author, book)
+        orm.remove(author, book)
+
+    stats = orm.stats()
+    assert stats.pending <= 16
+    assert stats.empty_relations + stats.stale_objects <= 16
+    assert stats.objects <= 16
+
+
+def test_refilled_relation_is_kept(orm, monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 16)
+    person = Person()
+    house = House()
+    orm.add(person, house)
+    members = orm.get_relation(person.houses)
+
+    for _ in range(SAMPLE_SIZE):
+        orm.remove(person, house)
+        orm.add(person, house)
+        orm.add(Author(), Book())
+        orm.remove(*orm.get_type(Author), *orm.get_type(Book))
+
+    assert orm.get_relation(person.houses) is members
+    assert orm.get_relation(house.person) is person
+
+
+def test_compact_changes(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    leader = ReplicationLeader(orm)
+    follower = ReplicationFollower()
+    for batch in leader.batches():
+        follower.apply(batch)
+    fork = orm.fork()
+
+    _remove_all(orm, person, houses[:-1])
+    version = orm.version
+    orm.compact(changes_before=version)
+    assert all(x > version for x in orm._changes.values())
+
+    orm.remove(person, houses[-1])
+    batches = list(leader.batches(follower.version))
+    assert len(batches) == 1 and batches[0].reset
+    follower.apply(batches[0])
+    assert not follower.orm.get_type(House)
+    assert not follower.orm.get_type(Person)
+
+    delta = orm.diff(fork)
+    assert delta.relations[person.houses.id].added == set(houses)
+
+
+def test_reclaim_after_fork(orm, monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 1)
+    author = Author()
+    orm.add(author, Book())
+    fork = orm.fork()
+    for _ in range(SAMPLE_SIZE):
+        book = Book()
+        orm.add(author, book)
+        orm.remove(author, book)
+
+    orm.compact()
+    stats = orm.stats()
+    assert stats.tombstones == 0
+    assert len(orm._container._data._local) <= 1
+    assert len(orm._objects._data._local) <= 2
+    assert not orm._relations._local
+    assert stats.objects == 2
+    assert len(fork.get_type(Book)) == 1
+
+    book = next(iter(orm.get_type(Book)))
+    orm.remove(author, book)
+    assert orm.stats().tombstones > 0
+    orm.compact()
+    assert orm.stats().tombstones == 0
+    assert orm.stats().objects == 0
+    assert fork.get_relation(author.books) == {book}
+
+
+def test_reclaim_invalidates_adjacency(orm, monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 1)
+    author = Author()
+    book = Book()
+    orm.add(author, book)
+    orm.remove(author, book)
+    snapshot = orm.adjacency()
+
+    orm.compact()
+    assert orm.adjacency() is not snapshot
+    assert not orm.adjacency().objects
+
+
+def _churn(orm, count=SAMPLE_SIZE * 4):
+    churned = list()
+    for _ in range(count):
+        author = Author()
+        book = Book()
+        orm.add(author, book)
+        orm.remove(author, book)
+        churned.append(ref(author))
+    return churned
+
+
+def test_changes_are_bounded(monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'CHANGES_LIMIT', 64)
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 16)
+    orm = ObjectRelationMapper()
+    churned = _churn(orm)
+    assert orm.stats().changes < 64 * 4
+
+    orm.compact()
+    gc.collect()
+    assert orm.stats().changes == 0
+    assert not any(x() for x in churned)
+
+
+def test_changes_retained_for_forks(monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'CHANGES_LIMIT', 64)
+    orm = ObjectRelationMapper()
+    person, house = Person(), House()
+    orm.add(person, house)
+    fork = orm.fork()
+    _churn(orm)
+    orm.remove(person, house)
+
+    assert orm._changed_between(fork) is not None
+    assert orm.diff(fork).relations[person.houses.id].added == {house}
+
+    del fork
+    gc.collect()
+    orm.compact()
+    assert orm.stats().changes == 0
+
+
+def test_changes_retained_for_followers(monkeypatch):
+    monkeypatch.setattr(ObjectRelationMapper, 'CHANGES_LIMIT', 64)
+    monkeypatch.setattr(ObjectRelationMapper, 'RECLAIM_THRESHOLD', 16)
+    orm = ObjectRelationMapper()
+    person = Person()
+    orm.add(person, House())
+    leader = ReplicationLeader(orm)
+    follower = ReplicationFollower()
+
+    for _ in range(4):
+        for batch in leader.batches(follower.version):
+            assert not batch.reset or not follower.version
+            follower.apply(batch)
+        _churn(orm)
+        orm.add(person, House())
+    for batch in leader.batches(follower.version):
+        assert not batch.reset
+        follower.apply(batch)
+
+    replica = next(iter(follower.orm.get_type(Person)))
+    assert len(follower.orm.get_relation(replica.houses)) == 5
+    assert len(follower._objects) < SAMPLE_SIZE
+    assert follower.orm.stats().objects < SAMPLE_SIZE
@@ -0,0 +1,217 @@
+from multiprocessing import Pipe
+
+import pytest
+
+from panek.error import ReplicationGapError
+from panek.object_relations import ObjectRelationMapper
+from panek.replication import ReplicationFollower, ReplicationLeader
+from panek.versions import ChangeKind
+from tests.conftest import Author, Book, House, NumberedHouse, \
+    NumberedStreet, Person, SAMPLE_SIZE, Street, TestObjects
+
+
+def test_diff_fork(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    fork = orm.fork()
+    new_house = House()
+    fork.add(person, new_house)
+    fork.remove(person, houses[0])
+
+    delta = orm.diff(fork)
+
+    person_delta = delta.relations[person.houses.id]
+    assert person_delta.added == {new_house}
+    assert person_delta.removed == {houses[0]}
+    assert delta.relations[new_house.person.id].added == {person}
+    assert delta.relations[houses[0].person.id].removed == {person}
+    assert delta.types[House].added == {new_house}
+    assert delta.types[House].removed == {houses[0]}
+    assert len(delta.relations) == 3
+
+    reverted = fork.diff(orm)
+    assert reverted.relations[person.houses.id].added == {houses[0]}
+
+
+def test_diff_siblings_and_unrelated(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    first = orm.fork()
+    first.remove(person, houses[0])
+    orm.remove(person, houses[1])
+    second = orm.fork()
+
+    assert not orm.diff(second)
+    delta = first.diff(second)
+    assert delta.relations[person.houses.id].added == {houses[0]}
+    assert delta.relations[person.houses.id].removed == {houses[1]}
+
+    other = ObjectRelationMapper()
+    delta = other.diff(orm)
+    assert len(delta.relations[person.houses.id].added) == SAMPLE_SIZE - 1
+    assert not orm.diff(orm)
+
+
+def _assert_replicated(leader_orm, follower_orm, people):
+    for person in people:
+        houses = leader_orm.get_relation(person.houses) or set()
+        replicated = follower_orm.get_relation(person.houses) or set()
+        assert {x.person.id for x in houses} == \
+            {x.person.id for x in replicated}
+    assert len(follower_orm.get_type(House)) == \
+        len(leader_orm.get_type(House))
+
+
+def _sent_refs(batches):
+    return sum(
+        len(added) + len(removed)
+        for batch in batches
+        for edges in (batch.relations, batch.types)
+        for added, removed in edges.values()
+    )
+
+
+def test_replication(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    leader = ReplicationLeader(orm, batch_size=7)
+    follower = ReplicationFollower()
+    sender, receiver = Pipe()
+
+    leader.send(sender, follower.version)
+    assert follower.receive(receiver) == orm.version
+    _assert_replicated(orm, follower.orm, [person])
+
+    replica = next(iter(follower.orm.get_type(Person)))
+    assert replica is not person
+    assert replica.houses.id == person.houses.id
+
+    # fall behind and catch up with changes only
+    another = Person()
+    for house in houses[:10]:
+        orm.remove(person, house)
+        orm.add(another, house)
+    batches = list(leader.batches(follower.version))
+    assert len({x for batch in batches for x in batch.relations}) == 12
+    assert _sent_refs(batches) == 40 + len(houses[:10]) + 1
+    for batch in batches:
+        follower.apply(batch)
+    _assert_replicated(orm, follower.orm, [person, another])
+    assert follower.orm.get_type(Person) == {
+        replica, follower.orm.get_relation(houses[0].person)
+    }
+
+
+def test_replication_gap(orm):
+    author = Author()
+    for _ in range(SAMPLE_SIZE):
+        orm.add(author, Book())
+    leader = ReplicationLeader(orm, batch_size=SAMPLE_SIZE)
+    follower = ReplicationFollower()
+
+    batches = list(leader.batches())
+    with pytest.raises(ReplicationGapError):
+        follower.apply(batches[1])
+    for batch in batches:
+        follower.apply(batch)
+    assert len(follower.orm.get_type(Book)) == SAMPLE_SIZE
+
+
+def test_replication_sends_changed_members(orm):
+    person = Person()
+    for _ in range(SAMPLE_SIZE):
+        orm.add(person, House())
+    leader = ReplicationLeader(orm)
+    follower = ReplicationFollower()
+    for batch in leader.batches():
+        follower.apply(batch)
+
+    house = House()
+    orm.add(person, house)
+    batches = list(leader.batches(follower.version))
+    assert _sent_refs(batches) == 3
+    assert batches[0].relations[person.houses.id] == ((house.person.id,), ())
+
+    for batch in batches:
+        follower.apply(batch)
+    _assert_replicated(orm, follower.orm, [person])
+
+
+def test_replication_resumes_between_batches(orm):
+    author = Author()
+    books = [Book() for _ in range(SAMPLE_SIZE)]
+    for book in books:
+        orm.add(author, book)
+    leader = ReplicationLeader(orm, batch_size=5)
+    follower = ReplicationFollower()
+
+    for batch in leader.batches():
+        follower.apply(batch)
+        if not batch.final:
+            break
+    for batch in leader.batches(follower.version):
+        follower.apply(batch)
+
+    assert follower.version == orm.version
+    assert len(follower.orm.get_type(Book)) == SAMPLE_SIZE
+    replica = next(iter(follower.orm.get_type(Author)))
+    assert len(follower.orm.get_relation(replica.books)) == SAMPLE_SIZE
+
+
+def test_diff_hub_relation(populated_orm: TestObjects):
+    orm, person, houses = populated_orm
+    fork = orm.fork()
+    house = House()
+    fork.add(person, house)
+
+    changes = orm._changed_between(fork)
+    assert changes[(ChangeKind.RELATION, person.houses.id)] == {house}
+    assert orm.diff(fork).relations[person.houses.id].added == {house}
+
+
+def test_replicate_ordered_relations(orm):
+    street = Street()
+    numbered = NumberedStreet()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    numbers = [NumberedHouse(i * 7 % SAMPLE_SIZE) for i in range(SAMPLE_SIZE)]
+    for house, number in zip(houses, numbers):
+        orm.add(street, house)
+        orm.add(numbered, number)
+    leader = ReplicationLeader(orm, batch_size=7)
+    follower = ReplicationFollower()
+    for batch in leader.batches():
+        follower.apply(batch)
+
+    orm.remove(street, houses[0])
+    orm.add(street, houses[0])
+    for batch in leader.batches(follower.version):
+        follower.apply(batch)
+
+    replica = next(iter(follower.orm.get_type(Street)))
+    page = follower.orm.iter_relation(replica.houses)
+    assert [x.person.id for x in page.items] == \
+        [x.person.id for x in houses[1:] + houses[:1]]
+    replica = next(iter(follower.orm.get_type(NumberedStreet)))
+    page = follower.orm.iter_relation(replica.houses)
+    assert [x.number for x in page.items] == sorted(x.number for x in numbers)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_replicate_reclaimed_objects(populated_orm: TestObjects, compact):
+    orm, person, houses = populated_orm
+    leader = ReplicationLeader(orm)
+    follower = ReplicationFollower()
+    for batch in leader.batches():
+        follower.apply(batch)
+
+    for _ in range(orm.RECLAIM_THRESHOLD + 100):
+        churned, house = Person(), House()
+        orm.add(churned, house)
+        orm.remove(churned, house)
+    orm.remove(person, houses[0])
+    if compact:
+        orm.compact()
+    assert len(orm._relations) < orm.RECLAIM_THRESHOLD + SAMPLE_SIZE
+
+    for batch in leader.batches(follower.version):
+        follower.apply(batch)
+    assert follower.version == orm.version
+    _assert_replicated(orm, follower.orm, [person])
+    assert len(follower.orm.get_type(Person)) == 1
@@ -0,0 +1,151 @@
+import sqlite3
+
+import pytest
+
+from panek.error import ForkNotSupportedError, MissingRelationError, \
+    StorageNotEmptyError
+from panek.object_relations import ObjectRelationMapper
+from panek.relations import ManyRelation
+from panek.sqlite import SQLiteStorage
+from tests.conftest import Author, Book, House, Person, SAMPLE_SIZE, Ssn, \
+    SsnPerson
+
+
+@pytest.fixture
+def sqlite_orm(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'panek.db'), cache_size=4,
+                            batch_size=8)
+    yield ObjectRelationMapper(backend=storage)
+    storage.close()
+
+
+def test_sqlite_many(sqlite_orm):
+    orm = sqlite_orm
+    person = Person()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(person, house)
+
+    assert orm.get_relation(person.houses) == set(houses)
+    assert all(orm.get_relation(x.person) is person for x in houses)
+    assert orm.get_type(House) == set(houses)
+    assert list(orm._container.iter_members(person.houses.id)) == houses
+
+    for house in houses[::2]:
+        orm.remove(person, house)
+
+    assert orm.get_relation(person.houses) == set(houses[1::2])
+    assert all(orm.get_relation(x.person) is None for x in houses[::2])
+    assert orm.get_type(House) == set(houses[1::2])
+
+    with pytest.raises(MissingRelationError):
+        orm.remove(person, houses[0])
+
+
+def test_sqlite_one(sqlite_orm):
+    orm = sqlite_orm
+    person = SsnPerson()
+    ssn = Ssn()
+    orm.add(person, ssn)
+
+    assert orm.get_relation(person.ssn) is ssn
+    orm.remove(person, ssn)
+    assert orm.get_relation(person.ssn) is None
+    assert not orm.get_type(Ssn)
+
+
+def test_sqlite_matches_memory(sqlite_orm):
+    memory = ObjectRelationMapper()
+    authors = [Author() for _ in range(5)]
+    books = [Book() for _ in range(SAMPLE_SIZE)]
+    for i, book in enumerate(books):
+        for author in authors[:i % 5 + 1]:
+            memory.add(author, book)
+            sqlite_orm.add(author, book)
+
+    assert not memory.diff(sqlite_orm)
+    assert not sqlite_orm.diff(memory)
+
+    with pytest.raises(ForkNotSupportedError):
+        sqlite_orm.fork()
+
+
+class _CountingConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.batches = 0
+
+    def executemany(self, *args):
+        self.batches += 1
+        return self.connection.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+def test_sqlite_batches_writes():
+    storage = SQLiteStorage(batch_size=1024)
+    orm = ObjectRelationMapper(backend=storage)
+    storage.connection = connection = _CountingConnection(storage.connection)
+
+    authors = [Author() for _ in range(5)]
+    books = [Book() for _ in range(SAMPLE_SIZE)]
+    for author in authors:
+        for book in books:
+            orm.add(author, book)
+    assert orm._container.has_member(authors[1].books.id, books[0])
+    assert not orm._container.has_member(authors[1].books.id, Book())
+    assert connection.batches == 0
+
+    orm.remove(authors[0], books[0])
+    assert len(orm.get_relation(authors[0].books)) == SAMPLE_SIZE - 1
+    assert connection.batches <= 3
+    storage.close()
+
+
+def test_sqlite_keeps_existing_file(tmp_path):
+    path = str(tmp_path / 'panek.db')
+    storage = SQLiteStorage(path)
+    orm = ObjectRelationMapper(backend=storage)
+    orm.add(Person(), House())
+    storage.close()
+
+    with pytest.raises(StorageNotEmptyError):
+        ObjectRelationMapper(backend=SQLiteStorage(path))
+
+    connection = sqlite3.connect(path)
+    rows = connection.execute('SELECT COUNT(*) FROM panek_relations')
+    assert rows.fetchone()[0] == 2
+    connection.close()
+
+
+def test_sqlite_releases_reclaimed_objects(sqlite_orm):
+    orm = sqlite_orm
+    person = Person()
+    houses = [House() for _ in range(SAMPLE_SIZE)]
+    for house in houses:
+        orm.add(person, house)
+    for house in houses:
+        orm.remove(person, house)
+    orm.compact()
+
+    storage = orm._container.storage
+    assert not storage._refs and not storage._objects
+    assert not orm._container._keys and not orm._objects._keys
+    orm.add(person, houses[0])
+    assert orm.get_relation(person.houses) == {houses[0]}
+
+
+def test_sqlite_keeps_unpicklable_keys(sqlite_orm):
+    class LocalPerson:
+        def __init__(self):
+            self.houses = ManyRelation(to_type=House)
+
+    orm = sqlite_orm
+    person, house = LocalPerson(), House()
+    orm.add(person, house)
+    orm._container.flush()
+
+    assert orm.get_relation(person.houses) == {house}
+    assert orm.get_type(LocalPerson) == {person}
+    assert set(orm._objects.keys()) == {LocalPerson, House}